@@ -0,0 +1,301 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+from xiasi import mesh_ped_grouped_verts_split_index, vehicle_map
+from xiasi.exporters import EXPORTERS, export_mesh, mesh_path
+from xiasi.binreader import BinaryReader
+from xiasi.index import find_resources, file_index
+from xiasi.resources import resource_types, TEXTURE, parse_texture_header, texture_detail
+from xiasi.streams import decode_indices, decode_positions, decode_uvs
+from xiasi.synth import write_zone
+from xiasi.textures import extract_textures, temp_path_for
+
+
+def synthetic_perm_data(size, seed=0, density=4096):
+    """Random bytes with zero runs, a known resource id every ~density bytes
+    and a well formed texture header every 64 ids."""
+    rng = random.Random(seed)
+    data = bytearray()
+    while len(data) < size:
+        data += rng.randbytes(min(size - len(data), 1 << 24))
+    ids = [res_type for res_type in resource_types if res_type != TEXTURE]
+    offset = 0
+    n = 0
+    while True:
+        offset += rng.randrange(density // 2, density * 3 // 2)
+        if offset + 256 > size:
+            break
+        n += 1
+        if n % 64 == 0:
+            name = f"tex_{n:08d}".encode()
+            header = struct.pack('<I', TEXTURE) + bytes(40) + name + bytes(4)
+            header += struct.pack('<IIHHI', rng.randrange(1, 4), 0, 256, 256, 0) + bytes(28)
+            header += struct.pack('<II', rng.randrange(1 << 24), 256 * 256)
+            data[offset:offset + len(header)] = header
+        elif n % 8 == 0:
+            data[offset:offset + 128] = bytes(128)
+        else:
+            data[offset:offset + 4] = struct.pack('<I', rng.choice(ids))
+    return bytes(data)
+
+
+def find_resources_loop(file_path):
+    # the original per-type data.find sweep, kept as the reference
+    results = {}
+    with open(file_path, 'rb') as file:
+        data = file.read()
+        for res_type, res_name in resource_types.items():
+            offsets = []
+            offset = data.find(struct.pack('<I', res_type))
+            while offset != -1:
+                if res_type == TEXTURE:
+                    header = parse_texture_header(data, offset)
+                    if header is None:
+                        offset = data.find(struct.pack('<I', res_type), offset + 1)
+                        continue
+                    detail = texture_detail(header)
+                else:
+                    detail = f"Offset: {offset}"
+                offsets.append((offset, detail))
+                offset = data.find(struct.pack('<I', res_type), offset + 1)
+            if offsets:
+                results[res_name] = offsets
+    return results
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_scan(path, size, workdir):
+    expected, loop_time = timed(find_resources_loop, path)
+    results, scan_time = timed(find_resources, path, False)
+    if results != expected:
+        raise SystemExit("single pass scan does not match the data.find loop")
+    _, build_time = timed(file_index, path)
+    cached, load_time = timed(find_resources, path)
+    if cached != expected:
+        raise SystemExit("sidecar index does not match the data.find loop")
+    mb = size / 2**20
+    hits = sum(len(offsets) for offsets in results.values())
+    print(f"scan: {mb:.0f} MB, {hits} resources")
+    print(f"  data.find loop  {loop_time:8.2f} s  {mb / loop_time:8.1f} MB/s")
+    print(f"  single pass     {scan_time:8.2f} s  {mb / scan_time:8.1f} MB/s  ({loop_time / scan_time:.1f}x)")
+    print(f"  index build     {build_time:8.2f} s")
+    print(f"  index load      {load_time:8.2f} s")
+
+
+def _high_water_kb():
+    # ru_maxrss survives exec and would report the parent's peak
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        # Windows, no peak to report
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KB elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_task(name, path):
+    if name == 'read':
+        find_resources_loop(path)
+    elif name == 'mmap':
+        find_resources(path, False)
+    elif name == 'vehicle':
+        vehicle_map.bin_parser(path, 'gltf')
+    elif name == 'ped':
+        mesh_ped_grouped_verts_split_index.bin_parser(path, 'gltf', 'shared')
+    elif name == 'dds':
+        extract_textures(path, temp_path_for(path), path + '_textures', 'dds')
+
+
+def run_child(name, path):
+    """(seconds, peak RSS in MB) of one task, run in a fresh interpreter so
+    the peak only covers that task."""
+    out = subprocess.run([sys.executable, __file__, '--child', name, path],
+                         check=True, capture_output=True, text=True).stdout
+    seconds, kb = out.split()[-2:]
+    return float(seconds), int(kb) / 1024
+
+
+def peak_rss(name, path):
+    return run_child(name, path)[1]
+
+
+def bench_reader(path, size, workdir):
+    mb = size / 2**20
+    print(f"peak RSS of find_resources on {mb:.0f} MB")
+    print(f"  file.read        {peak_rss('read', path):8.0f} MB")
+    print(f"  mmap             {peak_rss('mmap', path):8.0f} MB")
+
+
+def decode_per_element(g, offset, stride, count, uv_offset, index_offset):
+    # the original per-vertex loops of bin_parser
+    g.seek(offset)
+    vertices = []
+    for n in range(count):
+        tn = g.tell()
+        x = g.h(1)[0] * 2**-14
+        y = g.h(1)[0] * 2**-14
+        z = g.h(1)[0] * 2**-14
+        vertices.append((x, y, z))
+        g.seek(tn + stride)
+    g.seek(uv_offset)
+    uvs = []
+    for n in range(count):
+        tn = g.tell()
+        uvs.append(g.half(2))
+        g.seek(tn + 8)
+    g.seek(index_offset)
+    indices = g.H(count * 3)
+    return vertices, uvs, indices
+
+
+def decode_vectorized(g, offset, stride, count, uv_offset, index_offset):
+    return (decode_positions(g.data, offset, stride, count),
+            decode_uvs(g.data, uv_offset, 8, count),
+            decode_indices(g.data, index_offset, count * 3))
+
+
+def bench_streams(path, size, workdir, count=1000000):
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    stream_path = os.path.join(workdir, 'bench_streams.bin')
+    with open(stream_path, 'wb') as f:
+        f.write(rng.integers(-2**15, 2**15, (count, 8), dtype=np.int16).tobytes())
+        # random bytes would include float16 NaNs, which never compare equal
+        f.write(rng.random((count, 4)).astype('<f2').tobytes())
+        f.write(rng.integers(0, 2**16, count * 3, dtype=np.uint16).tobytes())
+    uv_offset = count * 16
+    index_offset = uv_offset + count * 8
+
+    with open(stream_path, 'rb') as f, BinaryReader(f) as g:
+        expected, loop_time = timed(decode_per_element, g, 0, 16, count, uv_offset, index_offset)
+        decoded, vector_time = timed(decode_vectorized, g, 0, 16, count, uv_offset, index_offset)
+        decoded = [array.tolist() for array in decoded]
+    if ([list(v) for v in expected[0]] != decoded[0] or [list(uv) for uv in expected[1]] != decoded[1]
+            or list(expected[2]) != decoded[2]):
+        raise SystemExit("vectorized stream decoding does not match the per-element loops")
+    print(f"stream decoding, {count} vertices + UVs + {count * 3} indices")
+    print(f"  per element     {loop_time:8.2f} s  {count / loop_time:12.0f} verts/s")
+    print(f"  vectorized      {vector_time:8.3f} s  {count / vector_time:12.0f} verts/s  ({loop_time / vector_time:.0f}x)")
+
+
+def write_txt_per_line(path, positions, uvs, indices):
+    # the original text dump, an f-string per vertex and a write per triangle
+    vertices = [f"{x} {y} {z}" for x, y, z in positions.tolist()]
+    vertices = [f"{vertex} {u} {v}" for vertex, (u, v) in zip(vertices, uvs.tolist())]
+    with open(path, 'w') as output_file:
+        output_file.write("vertex start\n")
+        output_file.write("\n".join(vertices) + "\n")
+        output_file.write("vertex end\n")
+        output_file.write("index start\n")
+        indices = indices.tolist()
+        for i in range(0, len(indices), 3):
+            output_file.write(f"{indices[i]} {indices[i+1]} {indices[i+2]}\n")
+        output_file.write("index end\n")
+
+
+def bench_export(path, size, workdir, count=60000, meshes=20):
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    positions = (rng.integers(-2**15, 2**15, (count, 3)) * 2**-14).astype(np.float32)
+    uvs = rng.random((count, 2)).astype(np.float16).astype(np.float32)
+    indices = rng.integers(0, count, count * 3).astype(np.uint16)
+
+    base = os.path.join(workdir, 'bench_export')
+    _, old_time = timed(lambda: [write_txt_per_line(f"{base}_old_{m}.txt", positions, uvs, indices)
+                                 for m in range(meshes)])
+    print(f"export, {meshes} meshes of {count} vertices")
+    print(f"  txt per line    {old_time:8.2f} s  {count * meshes / old_time:12.0f} verts/s")
+    for fmt in EXPORTERS:
+        _, new_time = timed(lambda: [export_mesh(mesh_path(f"{base}_{m}", fmt), positions, uvs, indices, fmt)
+                                     for m in range(meshes)])
+        written = sum(os.path.getsize(os.path.join(workdir, name)) for name in os.listdir(workdir)
+                      if name.startswith('bench_export_') and not name.startswith('bench_export_old'))
+        for name in os.listdir(workdir):
+            if name.startswith('bench_export_') and not name.startswith('bench_export_old'):
+                os.remove(os.path.join(workdir, name))
+        print(f"  {fmt:<15} {new_time:8.2f} s  {count * meshes / new_time:12.0f} verts/s  "
+              f"{written / 2**20:8.1f} MB")
+
+
+def bench_zone(path, size, workdir):
+    zone_dir = os.path.join(workdir, 'zone')
+    os.makedirs(zone_dir)
+    zone = os.path.join(zone_dir, 'bench_zone.perm.bin')
+    stats, gen_time = timed(write_zone, zone, size)
+    mb = stats.perm_size / 2**20
+    print(f"synthetic zone: {mb:.0f} MB perm.bin, {stats.temp_size / 2**20:.0f} MB temp.bin, "
+          f"{stats.models} models, {stats.vertices} vertices, {stats.textures} textures "
+          f"(written in {gen_time:.1f} s)")
+    print(f"  {'':24} {'seconds':>8} {'MB/s':>8} {'per second':>20} {'peak RSS':>10}")
+    tasks = [
+        ('find_resources', 'mmap', None, None),
+        ('vehicle bin_parser', 'vehicle', stats.vertices, 'verts'),
+        ('ped bin_parser (shared)', 'ped', stats.triangles, 'tris'),
+        ('textures to dds', 'dds', stats.textures, 'textures'),
+    ]
+    # extract_textures takes its headers from the sidecar index, built here so
+    # the texture row doesn't include the scan the find_resources row times
+    file_index(zone)
+    keep = set(os.listdir(zone_dir))
+    for label, name, count, unit in tasks:
+        seconds, peak = run_child(name, zone)
+        rate = f"{count / seconds:12.0f} {unit:>7}" if count else ""
+        print(f"  {label:24} {seconds:8.2f} {mb / seconds:8.1f} {rate:>20} {peak:7.0f} MB")
+        # drop what the task wrote before the next one runs
+        for entry in os.listdir(zone_dir):
+            output = os.path.join(zone_dir, entry)
+            if entry in keep:
+                continue
+            if os.path.isdir(output):
+                shutil.rmtree(output)
+            else:
+                os.remove(output)
+
+
+BENCHMARKS = {'scan': bench_scan, 'reader': bench_reader, 'streams': bench_streams,
+              'export': bench_export, 'zone': bench_zone}
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--child']:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, seconds = timed(run_task, sys.argv[2], sys.argv[3])
+        print(seconds, _high_water_kb())
+        sys.exit()
+
+    parser = argparse.ArgumentParser(description="Parser benchmarks on synthetic perm.bin data")
+    parser.add_argument('benchmarks', nargs='*', choices=[[]] + list(BENCHMARKS), help="default: all")
+    parser.add_argument('--size', type=int, default=256, help="synthetic file size in MB")
+    parser.add_argument('--dir', default=None, help="where to write the synthetic files")
+    args = parser.parse_args()
+
+    size = args.size * 2**20
+    with tempfile.TemporaryDirectory(dir=args.dir) as workdir:
+        path = os.path.join(workdir, 'bench_synthetic.perm.bin')
+        with open(path, 'wb') as f:
+            f.write(synthetic_perm_data(size))
+        for name in args.benchmarks or BENCHMARKS:
+            BENCHMARKS[name](path, size, workdir)
@@ -0,0 +1,4 @@
+from xiasi.textures import main
+
+if __name__ == "__main__":
+    main()
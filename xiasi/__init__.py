@@ -0,0 +1,45 @@
+"""Readers for perm.bin/temp.bin zone files.
+
+Nothing is imported until it is first used, so `import xiasi` and the
+command line (python -m xiasi) start fast; numpy is only loaded by the
+vectorized scan and decode paths and tkinter only by xiasi.dawg.
+"""
+import importlib
+
+_EXPORTS = {
+    'resource_types': 'resources',
+    'TEXTURE': 'resources',
+    'TextureHeader': 'resources',
+    'parse_texture_header': 'resources',
+    'texture_detail': 'resources',
+    'scan_type_ids': 'resources',
+    'BinaryReader': 'binreader',
+    'mapped': 'binreader',
+    'Chunk': 'chunks',
+    'ChainError': 'chunks',
+    'walk_chunks': 'chunks',
+    'iter_chunks': 'chunks',
+    'Dispatcher': 'registry',
+    'type_id': 'registry',
+    'type_name': 'registry',
+    'PermBinArchive': 'archive',
+    'Model': 'model',
+    'Tables': 'model',
+    'FileIndex': 'index',
+    'file_index': 'index',
+    'find_resources': 'index',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,62 @@
+import argparse
+import sys
+
+from . import instrument
+
+
+def list_resources(args):
+    from .index import find_resources
+
+    for res_name, offsets in find_resources(args.path, cache=not args.no_cache).items():
+        if args.offsets:
+            for offset, detail in offsets:
+                print(f"{res_name}\t{offset}\t{detail}")
+        else:
+            print(f"{res_name}\t{len(offsets)}")
+
+
+def list_chunks(args):
+    from .index import file_index
+
+    for chunk in file_index(args.path, cache=not args.no_cache).chunks:
+        print(f"{chunk.type_id:#010x}\t{chunk.offset}\t{chunk.size}\t{chunk.resource_id}")
+
+
+def list_textures(args):
+    from .index import file_index
+    from .resources import texture_detail
+
+    for header in file_index(args.path, cache=not args.no_cache).textures:
+        print(f"{header.offset}\t{texture_detail(header)}")
+
+
+COMMANDS = {
+    'resources': (list_resources, "resource counts per type, or every offset with --offsets"),
+    'chunks': (list_chunks, "the chunk chain: type id, offset, size, resource id"),
+    'textures': (list_textures, "parsed texture headers"),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m xiasi', description="Inspect perm.bin files")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, (command, help) in COMMANDS.items():
+        sub = commands.add_parser(name, help=help)
+        sub.add_argument('path', help="perm.bin file")
+        sub.add_argument('--no-cache', action='store_true', help="rescan instead of using the .xidx sidecar")
+        if name == 'resources':
+            sub.add_argument('--offsets', action='store_true', help="print every offset and its detail")
+        instrument.add_arguments(sub)
+        sub.set_defaults(run=command)
+    args = parser.parse_args(argv)
+    try:
+        with instrument.from_args(args):
+            args.run(args)
+    except OSError as e:
+        print(f"{args.path}: {e.strerror}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
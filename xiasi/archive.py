@@ -0,0 +1,155 @@
+from collections import namedtuple
+
+from .chunks import CHUNK_HEADER
+from .index import file_index
+from .model import STREAM_HEADER, Stream, read_mesh_records
+from .registry import type_id
+from .streams import decode_indices, decode_positions, decode_uvs
+
+Mesh = namedtuple('Mesh', 'positions uvs indices material')
+
+
+class PermBinArchive:
+    """Random access to the resources of one perm.bin.
+
+    The chunk index comes from the .xidx sidecar when it is current, so
+    opening a file that was indexed before reads only the sidecar. After
+    that every lookup is a dict access and every read is a bounded read of
+    just the bytes asked for; nothing is decoded until it is requested.
+    bytes_read counts what was read from the perm.bin and temp.bin.
+    """
+
+    def __init__(self, path, cache=True):
+        self.path = path
+        self.index = file_index(path, cache)
+        self.file = open(path, 'rb')
+        self.bytes_read = 0
+        self._by_id = None
+        self._by_type = None
+        self._textures = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def read_at(self, offset, size, file=None):
+        file = file or self.file
+        file.seek(offset)
+        data = file.read(size)
+        self.bytes_read += len(data)
+        if len(data) != size:
+            raise ValueError(f"Short read of {size} bytes at offset {offset} in {file.name}")
+        return data
+
+    @property
+    def by_id(self):
+        if self._by_id is None:
+            self._by_id = {}
+            for chunk in self.index.chunks:
+                self._by_id.setdefault(chunk.resource_id, chunk)
+        return self._by_id
+
+    @property
+    def by_type(self):
+        if self._by_type is None:
+            self._by_type = {}
+            for chunk in self.index.chunks:
+                self._by_type.setdefault(chunk.type_id, []).append(chunk)
+        return self._by_type
+
+    @property
+    def textures(self):
+        if self._textures is None:
+            self._textures = {}
+            for header in self.index.textures:
+                self._textures.setdefault(header.name, header)
+        return self._textures
+
+    def chunk(self, resource_id):
+        """The chunk holding resource vc[3] == resource_id. KeyError if none does."""
+        return self.by_id[resource_id]
+
+    def chunks(self, type=None):
+        """Every chunk, or only those of a type given by name or id."""
+        if type is None:
+            return list(self.index.chunks)
+        return list(self.by_type.get(type_id(type), ()))
+
+    def read(self, chunk):
+        """The data of a chunk (or resource id), from data_offset to the chunk's end."""
+        if not hasattr(chunk, 'data_offset'):
+            chunk = self.chunk(chunk)
+        end = chunk.offset + CHUNK_HEADER.size + chunk.size
+        return self.read_at(chunk.data_offset, end - chunk.data_offset)
+
+    def stream(self, resource_id):
+        """A Buffer resource's record; offset is where its elements start."""
+        chunk = self.chunk(resource_id)
+        if chunk.type_id != type_id('Buffer'):
+            raise ValueError(f"Resource {resource_id} is not a Buffer")
+        v = STREAM_HEADER.unpack(self.read_at(chunk.data_offset, STREAM_HEADER.size))
+        return Stream(resource_id, v[3], v[4], chunk.data_offset + STREAM_HEADER.size)
+
+    def positions(self, resource_id):
+        stream = self.stream(resource_id)
+        data = self.read_at(stream.offset, stream.stride * stream.count)
+        return decode_positions(data, 0, stream.stride, stream.count)
+
+    def uvs(self, resource_id):
+        stream = self.stream(resource_id)
+        data = self.read_at(stream.offset, stream.stride * stream.count)
+        return decode_uvs(data, 0, stream.stride, stream.count)
+
+    def indices(self, resource_id, start=0, stop=None):
+        """Indices [start:stop] of an index stream, reading only that range."""
+        stream = self.stream(resource_id)
+        start, stop, _ = slice(start, stop).indices(stream.count)
+        stop = max(start, stop)
+        data = self.read_at(stream.offset + start * 2, (stop - start) * 2)
+        return decode_indices(data, 0, stop - start)
+
+    def mesh_records(self, resource_id):
+        """The 36-uint mesh records of a ModelData resource."""
+        chunk = self.chunk(resource_id)
+        if chunk.type_id != type_id('ModelData'):
+            raise ValueError(f"Resource {resource_id} is not a ModelData")
+        return read_mesh_records(self.read(chunk), 0)
+
+    def mesh(self, resource_id, m):
+        """Submesh m of a ModelData resource, decoded from just its own streams.
+
+        uvs is None when the mesh has no UV stream or it doesn't match the
+        vertex count, the same rule the vehicle parser applies.
+        """
+        va = self.mesh_records(resource_id)[m]
+        positions = self.positions(va[15])
+        uvs = None
+        uv_chunk = self.by_id.get(va[23])
+        if uv_chunk is not None and uv_chunk.type_id == type_id('Buffer'):
+            uvs = self.uvs(va[23])
+            if len(uvs) != len(positions):
+                uvs = None
+        indices = self.indices(va[11], va[29], va[29] + va[30] * 3)
+        return Mesh(positions, uvs, indices, va[3])
+
+    def texture(self, name):
+        """A texture's header by name. KeyError if there is none."""
+        return self.textures[name]
+
+    def texture_data(self, name, temp_path=None):
+        """The raw DXT blocks of a texture, read from the temp.bin next to
+        the perm.bin unless temp_path says otherwise."""
+        from .textures import temp_path_for
+
+        header = self.texture(name)
+        temp_path = temp_path or temp_path_for(self.path)
+        if temp_path is None:
+            raise FileNotFoundError(f"No temp.bin next to {self.path}")
+        with open(temp_path, 'rb') as file:
+            return self.read_at(header.raw_offset, header.raw_size, file)
+
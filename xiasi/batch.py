@@ -0,0 +1,174 @@
+import argparse
+import importlib
+import logging
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import instrument
+from .exporters import EXPORTERS
+from .manifest import MANIFEST_NAME, Manifest, content_hash
+from .mesh_ped_grouped_verts_split_index import LAYOUTS
+
+PARSERS = {
+    'vehicle': 'vehicle_map',
+    'ped': 'mesh_ped_grouped_verts_split_index',
+}
+
+
+def discover(root):
+    """Sorted (perm_path, temp_path) pairs under root, temp_path is None when
+    the perm.bin has no matching temp.bin next to it."""
+    pairs = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        names = set(filenames)
+        for name in sorted(filenames):
+            if name.endswith('.perm.bin'):
+                temp = name[:-len('perm.bin')] + 'temp.bin'
+                pairs.append((os.path.join(dirpath, name),
+                              os.path.join(dirpath, temp) if temp in names else None))
+    return pairs
+
+
+def convert(parser, perm_path, temp_path, fmt, log_level='warning', options=None, stats=False, profile=None):
+    """Run one parser's file_format_parser on a file, in a worker process.
+
+    Returns (perm_path, seconds, error, digest, outputs, report) with error
+    None on success, so a bad file is reported instead of taking the whole
+    run down. The parser runs strict, so a file whose chunk chain breaks off
+    is a failure too. report is the file's counters and timers when stats is
+    set.
+    With profile set the parse runs under cProfile and the stats are saved
+    to that path.
+    """
+    logging.basicConfig(level=log_level.upper(), format='%(levelname)s %(name)s: %(message)s')
+    if stats:
+        instrument.reset()
+        instrument.enable()
+    profiler = None
+    if profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+    start = time.perf_counter()
+    digest = None
+    outputs = []
+    try:
+        module = importlib.import_module("." + PARSERS[parser], __package__)
+        if profiler is not None:
+            profiler.enable()
+        try:
+            outputs = module.file_format_parser(perm_path, fmt, strict=True, **(options or {}))
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(profile)
+        digest = content_hash(perm_path)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    report = instrument.report() if stats else None
+    return perm_path, time.perf_counter() - start, error, digest, outputs, report
+
+
+def _add_profile(profiles, path):
+    # a worker's stats file, folded into the run's and removed
+    import pstats
+
+    if not os.path.exists(path):
+        return profiles
+    if profiles is None:
+        profiles = pstats.Stats(path)
+    else:
+        profiles.add(path)
+    os.remove(path)
+    return profiles
+
+
+def run(pairs, parser, fmt, workers=None, log_level='warning', manifest=None, options=None, profile=None):
+    """Convert pairs across a process pool, skipping inputs the manifest says
+    are already exported with this parser, format, options and parser version.
+    With instrument enabled the workers' counters and timers are added to
+    this process's. With profile set every file is parsed under cProfile in
+    its worker and the combined stats are saved to that path."""
+    failures = []
+    profiles = None
+    version = importlib.import_module("." + PARSERS[parser], __package__).PARSER_VERSION
+    output_kind = ":".join([fmt] + [f"{key}={value}" for key, value in sorted((options or {}).items())])
+    start = time.perf_counter()
+    skipped = 0
+    if manifest is not None:
+        todo = [pair for pair in pairs if not manifest.is_current(pair[0], parser, output_kind, version)]
+        skipped = len(pairs) - len(todo)
+        pairs = todo
+    # biggest files first so a large one doesn't start last and hold up the pool
+    pairs = sorted(pairs, key=lambda pair: os.path.getsize(pair[0]), reverse=True)
+    try:
+        if pairs:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # future -> the profile its worker writes, if any
+                futures = {}
+                for n, (perm, temp) in enumerate(pairs):
+                    out = f"{profile}.{n}" if profile else None
+                    futures[pool.submit(convert, parser, perm, temp, fmt, log_level, options, instrument.enabled,
+                                        out)] = out
+                for done, future in enumerate(as_completed(futures), 1):
+                    path, seconds, error, digest, outputs, report = future.result()
+                    if report is not None:
+                        instrument.merge(report)
+                    if futures[future]:
+                        profiles = _add_profile(profiles, futures[future])
+                    status = "FAILED" if error else "ok"
+                    print(f"[{done}/{len(futures)}] {status:6} {seconds:7.2f} s  {path}", flush=True)
+                    if error:
+                        failures.append((path, error))
+                    elif manifest is not None:
+                        manifest.record(path, parser, output_kind, version, digest, outputs)
+    finally:
+        if manifest is not None:
+            manifest.save()
+        if profiles is not None:
+            profiles.dump_stats(profile)
+    elapsed = time.perf_counter() - start
+    print(f"{len(pairs) - len(failures)} converted, {skipped} unchanged, {len(failures)} failed in {elapsed:.1f} s")
+    for path, error in failures:
+        print(f"\n{path}\n{error}", file=sys.stderr)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert every perm.bin under a directory tree in parallel")
+    parser.add_argument('root', help="game data directory")
+    parser.add_argument('--parser', choices=PARSERS, default='vehicle')
+    parser.add_argument('--format', choices=EXPORTERS, default='txt', help="mesh output format")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('--layout', choices=LAYOUTS, default=None,
+                        help="ped parser only: how the pooled vertex buffer is written")
+    parser.add_argument('--verbose', action='store_true', help="log every file the parsers open (--log-level info)")
+    parser.add_argument('--manifest', default=None, help=f"re-export cache (default: <root>/{MANIFEST_NAME})")
+    parser.add_argument('--force', action='store_true', help="re-export everything, ignoring the manifest")
+    instrument.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.layout and args.parser != 'ped':
+        parser.error("--layout only applies to the ped parser")
+
+    manifest = Manifest(args.manifest or os.path.join(args.root, MANIFEST_NAME))
+    if args.force:
+        manifest.entries = {}
+    if args.verbose and args.log_level == 'warning':
+        args.log_level = 'info'
+    options = {'layout': args.layout} if args.layout else None
+    # the parsing happens in the workers, so they run the profiler and this
+    # process only merges their stats
+    profile, args.profile = args.profile, None
+    with instrument.from_args(args):
+        failures = run(discover(args.root), args.parser, args.format, args.workers, args.log_level, manifest,
+                       options, profile)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+
+_structs = {}
+
+
+def _struct(code, count):
+    key = (code, count)
+    s = _structs.get(key)
+    if s is None:
+        s = _structs[key] = struct.Struct('<' + code * count)
+    return s
+
+
+def map_file(file):
+    """Read-only mmap of an open binary file, or b'' for an empty one."""
+    if os.fstat(file.fileno()).st_size == 0:
+        return b''
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def release(data, start, length):
+    """Drop already scanned pages of a mapping from this process's RSS.
+
+    The pages stay in the page cache, touching them again just faults them
+    back in. start has to be page aligned. No-op for non-mmap buffers.
+    """
+    if isinstance(data, mmap.mmap) and hasattr(mmap, 'MADV_DONTNEED'):
+        data.madvise(mmap.MADV_DONTNEED, start, length)
+
+
+@contextmanager
+def mapped(file_path):
+    with open(file_path, 'rb') as file:
+        data = map_file(file)
+        try:
+            yield data
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+
+class BinaryReader:
+    """File-like reader over a read-only mmap of the file.
+
+    Values are unpacked straight out of the mapping with unpack_from, nothing
+    is copied except what read()/word() hand back.
+    """
+
+    def __init__(self, file):
+        self.data = map_file(file)
+        self.size = len(self.data)
+        self.pos = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=0):
+        if whence == os.SEEK_CUR:
+            offset += self.pos
+        elif whence == os.SEEK_END:
+            offset += self.size
+        self.pos = offset
+
+    def read(self, size):
+        start = self.pos
+        self.pos = min(start + size, self.size)
+        return self.data[start:self.pos]
+
+    def _unpack(self, code, size, count):
+        values = _struct(code, count).unpack_from(self.data, self.pos)
+        self.pos += size * count
+        return values
+
+    def i(self, count=1):
+        return self._unpack('I', 4, count)
+
+    def H(self, count=1):
+        return self._unpack('H', 2, count)
+
+    def h(self, count=1):
+        return self._unpack('h', 2, count)
+
+    def B(self, count=1):
+        return self._unpack('B', 1, count)
+
+    def half(self, count=1):
+        return self._unpack('e', 2, count)
+
+    def f(self, count=1):
+        return self._unpack('f', 4, count)
+
+    def word(self, count):
+        return self.read(count)
+
+    def fileSize(self):
+        return self.size
@@ -0,0 +1,116 @@
+import collections
+import hashlib
+import os
+
+
+class LRUCache:
+    """Least recently used cache bounded by the total size of its values.
+
+    sizeof(value) gives the cost of an entry in bytes; once the total goes
+    over budget the oldest entries are evicted. A value larger than the
+    whole budget is not cached at all.
+    """
+
+    def __init__(self, budget, sizeof):
+        self.budget = budget
+        self.sizeof = sizeof
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value):
+        self.pop(key)
+        size = self.sizeof(value)
+        if size > self.budget:
+            return
+        self.entries[key] = (value, size)
+        self.size += size
+        while self.size > self.budget:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.size -= evicted
+
+    def pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def stats(self):
+        return f"cache {len(self.entries)} files, {self.size // 2**20} MB, {self.hits} hits, {self.misses} misses"
+
+
+class DiskCache:
+    """Byte strings stored as files in a directory, bounded by their total size.
+
+    Reading an entry bumps its mtime, so when the directory goes over budget
+    the least recently used files are deleted first. Failures to read or
+    write are treated as misses, the cache is only ever an optimisation.
+    """
+
+    def __init__(self, path, budget):
+        self.path = path
+        self.budget = budget
+        self.size = None
+
+    def file_name(self, key):
+        return os.path.join(self.path, hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest())
+
+    def get(self, key):
+        file_name = self.file_name(key)
+        try:
+            with open(file_name, 'rb') as file:
+                value = file.read()
+            os.utime(file_name)
+        except OSError:
+            return None
+        return value
+
+    def put(self, key, value):
+        file_name = self.file_name(key)
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(file_name + '.tmp', 'wb') as file:
+                file.write(value)
+            os.replace(file_name + '.tmp', file_name)
+        except OSError:
+            return
+        if self.size is None:
+            self.prune()
+        else:
+            self.size += len(value)
+            if self.size > self.budget:
+                self.prune()
+
+    def prune(self):
+        entries = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        entries.sort()
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.size <= self.budget:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
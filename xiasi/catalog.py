@@ -0,0 +1,219 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .resources import TEXTURE_FORMATS, resource_types
+
+CATALOG_NAME = '.xiasi_catalog.db'
+CATALOG_VERSION = 1
+
+# paths are stored relative to the directory holding the database, so an
+# install can be moved together with its catalog
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    temp_path TEXT,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resources (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    offset INTEGER NOT NULL,
+    type_id INTEGER NOT NULL,
+    resource_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS textures (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    offset INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    format INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    raw_offset INTEGER NOT NULL,
+    raw_size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS resources_file ON resources(file_id);
+CREATE INDEX IF NOT EXISTS resources_id ON resources(resource_id);
+CREATE INDEX IF NOT EXISTS resources_type ON resources(type_id);
+CREATE INDEX IF NOT EXISTS textures_file ON textures(file_id);
+CREATE INDEX IF NOT EXISTS textures_name ON textures(name);
+"""
+
+
+def connect(db_path):
+    db = sqlite3.connect(db_path)
+    db.execute("PRAGMA foreign_keys = ON")
+    version = db.execute("PRAGMA user_version").fetchone()[0]
+    if version != CATALOG_VERSION:
+        db.executescript("DROP TABLE IF EXISTS textures; DROP TABLE IF EXISTS resources; DROP TABLE IF EXISTS files;")
+        db.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+    db.executescript(SCHEMA)
+    return db
+
+
+def scan(perm_path):
+    """Chunks and textures of one perm.bin, in a worker process.
+
+    Returns (perm_path, stat, rows, texture rows, error) with error None on
+    success.
+    """
+    from .index import file_index
+
+    try:
+        stat = os.stat(perm_path)
+        index = file_index(perm_path)
+        resources = [(chunk.offset, chunk.type_id, chunk.resource_id) for chunk in index.chunks]
+        textures = [(header.offset, header.name, header.format, header.width, header.height,
+                     header.raw_offset, header.raw_size) for header in index.textures]
+        return perm_path, (stat.st_size, stat.st_mtime_ns), resources, textures, None
+    except Exception:
+        return perm_path, None, [], [], traceback.format_exc()
+
+
+def build(root, db_path=None, workers=None):
+    """Bring the catalog for root up to date. Files whose size and mtime match
+    their row are skipped, the rest are scanned across a process pool, and
+    rows for files that are gone are dropped. Returns the failures."""
+    from .batch import discover
+
+    db_path = db_path or os.path.join(root, CATALOG_NAME)
+    base = os.path.dirname(os.path.abspath(db_path))
+    db = connect(db_path)
+    known = {path: (file_id, size, mtime) for file_id, path, size, mtime in
+             db.execute("SELECT id, path, size, mtime FROM files")}
+
+    start = time.perf_counter()
+    todo = []
+    seen = set()
+    temps = {}
+    for perm, temp in discover(root):
+        key = os.path.relpath(os.path.abspath(perm), base)
+        seen.add(key)
+        temps[perm] = temp and os.path.relpath(os.path.abspath(temp), base)
+        row = known.get(key)
+        stat = os.stat(perm)
+        if row is None or row[1:] != (stat.st_size, stat.st_mtime_ns):
+            todo.append(perm)
+
+    gone = [row[0] for key, row in known.items() if key not in seen]
+    with db:
+        db.executemany("DELETE FROM files WHERE id = ?", [(file_id,) for file_id in gone])
+
+    failures = []
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(scan, perm) for perm in todo]
+            for done, future in enumerate(as_completed(futures), 1):
+                perm, stat, resources, textures, error = future.result()
+                key = os.path.relpath(os.path.abspath(perm), base)
+                if error:
+                    failures.append((perm, error))
+                    print(f"[{done}/{len(futures)}] FAILED {perm}", flush=True)
+                    continue
+                with db:
+                    db.execute("DELETE FROM files WHERE path = ?", (key,))
+                    file_id = db.execute("INSERT INTO files (path, temp_path, size, mtime) VALUES (?, ?, ?, ?)",
+                                         (key, temps[perm]) + stat).lastrowid
+                    db.executemany("INSERT INTO resources VALUES (?, ?, ?, ?)",
+                                   [(file_id,) + row for row in resources])
+                    db.executemany("INSERT INTO textures VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                   [(file_id,) + row for row in textures])
+                print(f"[{done}/{len(futures)}] ok     {perm}", flush=True)
+    db.close()
+    elapsed = time.perf_counter() - start
+    print(f"{len(todo) - len(failures)} indexed, {len(seen) - len(todo)} unchanged, "
+          f"{len(gone)} removed, {len(failures)} failed in {elapsed:.1f} s")
+    for path, error in failures:
+        print(f"\n{path}\n{error}", file=sys.stderr)
+    return failures
+
+
+def _pattern(name):
+    # shell-style names use GLOB, plain names an exact match on the index
+    if any(c in name for c in '*?['):
+        return "GLOB", name
+    return "=", name
+
+
+def texture_locations(db_path, name, limit=None):
+    """(perm_path, temp_path, offset, name, format, width, height, raw_offset,
+    raw_size) for every texture called name, which may use * ? [] wildcards."""
+    base = os.path.dirname(os.path.abspath(db_path))
+    op, pattern = _pattern(name)
+    query = ("SELECT files.path, files.temp_path, offset, name, format, width, height, raw_offset, raw_size "
+             f"FROM textures JOIN files ON files.id = file_id WHERE name {op} ? ORDER BY name, files.path")
+    if limit is not None:
+        query += f" LIMIT {int(limit)}"
+    db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        results = []
+        for path, temp, *row in db.execute(query, (pattern,)):
+            results.append((os.path.join(base, path), temp and os.path.join(base, temp), *row))
+        return results
+    finally:
+        db.close()
+
+
+def resource_locations(db_path, resource_id):
+    """(perm_path, offset, type name) of every chunk holding resource_id."""
+    base = os.path.dirname(os.path.abspath(db_path))
+    db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = db.execute("SELECT files.path, offset, type_id FROM resources JOIN files ON files.id = file_id "
+                          "WHERE resource_id = ? ORDER BY files.path, offset", (resource_id,))
+        return [(os.path.join(base, path), offset, resource_types.get(type_id, f"{type_id:#010x}"))
+                for path, offset, type_id in rows]
+    finally:
+        db.close()
+
+
+def find_catalog(directory):
+    """The catalog in directory or the nearest parent holding one, or None."""
+    directory = os.path.abspath(directory)
+    while True:
+        db_path = os.path.join(directory, CATALOG_NAME)
+        if os.path.exists(db_path):
+            return db_path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index every perm.bin under a directory tree and look assets up")
+    commands = parser.add_subparsers(dest='command', required=True)
+    sub = commands.add_parser('build', help="create or update the catalog")
+    sub.add_argument('root', help="game data directory")
+    sub.add_argument('--db', default=None, help=f"catalog file (default: <root>/{CATALOG_NAME})")
+    sub.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    sub = commands.add_parser('texture', help="where is a texture, by name or * ? [] pattern")
+    sub.add_argument('name')
+    sub.add_argument('--db', default=None, help=f"catalog file (default: nearest {CATALOG_NAME})")
+    sub = commands.add_parser('resource', help="where is a resource id")
+    sub.add_argument('resource_id', type=lambda value: int(value, 0))
+    sub.add_argument('--db', default=None, help=f"catalog file (default: nearest {CATALOG_NAME})")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        return 1 if build(args.root, args.db, args.workers) else 0
+
+    db_path = args.db or find_catalog(os.getcwd())
+    if db_path is None or not os.path.exists(db_path):
+        parser.error(f"no {CATALOG_NAME} here or in a parent directory, pass --db")
+    if args.command == 'texture':
+        for perm, temp, offset, name, format, width, height, raw_offset, raw_size in texture_locations(db_path, args.name):
+            print(f"{name}\t{perm}\t{offset}\t{TEXTURE_FORMATS.get(format, 'Unknown')}\t{width}x{height}")
+    else:
+        for perm, offset, type_name in resource_locations(db_path, args.resource_id):
+            print(f"{args.resource_id}\t{perm}\t{offset}\t{type_name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
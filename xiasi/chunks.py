@@ -0,0 +1,63 @@
+import mmap
+import struct
+from collections import namedtuple
+
+from .binreader import release
+
+# every chunk starts with a 4-uint header (vm), vm[3] bytes further on comes
+# a 7-uint info block (vc) and 36 bytes of padding before the chunk data,
+# the next chunk starts vm[1] bytes after the header
+CHUNK_HEADER = struct.Struct('<4I')
+CHUNK_INFO = struct.Struct('<7I')
+CHUNK_PADDING = 36
+
+# iter_chunks hands pages back to the OS once it is this far past them
+RELEASE_BLOCK = 1 << 24
+
+Chunk = namedtuple('Chunk', 'type_id offset size data_offset resource_id')
+
+
+class ChainError(ValueError):
+    """The chunk chain runs off the end of the file."""
+
+
+def walk_chunks(data, start=0):
+    """Yield a Chunk for every link of the chunk chain in data.
+
+    offset is where the vm header starts, size is vm[1], data_offset is where
+    the bin parsers start reading after the vc block and padding, and
+    resource_id is vc[3]. Raises ChainError if the chain runs off the end.
+    """
+    size = len(data)
+    pos = start
+    while pos != size:
+        if pos + CHUNK_HEADER.size > size:
+            raise ChainError(f"Truncated chunk header at offset {pos}")
+        vm = CHUNK_HEADER.unpack_from(data, pos)
+        t = pos + CHUNK_HEADER.size
+        info = t + vm[3]
+        end = t + vm[1]
+        if info + CHUNK_INFO.size > size or end > size or end <= pos:
+            raise ChainError(f"Chunk at offset {pos} runs past the end of the file")
+        vc = CHUNK_INFO.unpack_from(data, info)
+        yield Chunk(vm[0], pos, vm[1], info + CHUNK_INFO.size + CHUNK_PADDING, vc[3])
+        pos = end
+
+
+def iter_chunks(data, start=0, block=RELEASE_BLOCK):
+    """walk_chunks over a mapping in flat memory.
+
+    Reading a header faults in the pages around it, so a plain walk of a
+    file with many chunks ends up with most of it resident. Every block
+    bytes this drops the pages of the two blocks behind the walk, which also
+    covers streams the caller decoded from chunks it was given a little
+    earlier. Dropped pages are only unmapped from this process, reading them
+    again maps them back in from the page cache.
+    """
+    behind = ahead = start - start % mmap.PAGESIZE
+    for chunk in walk_chunks(data, start):
+        if chunk.offset - ahead >= block:
+            end = chunk.offset - chunk.offset % mmap.PAGESIZE
+            release(data, behind, end - behind)
+            behind, ahead = ahead, end
+        yield chunk
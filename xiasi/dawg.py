@@ -0,0 +1,446 @@
+import tkinter as tk
+from tkinter import filedialog
+from tkinter import ttk
+import os
+import glob
+import collections
+import base64
+import functools
+import queue
+import sqlite3
+import threading
+import time
+
+from .binreader import mapped
+from .resources import TEXTURE_FORMATS, parse_texture_header
+from .cache import DiskCache, LRUCache
+from .catalog import CATALOG_NAME, find_catalog, resource_locations, texture_locations
+from .index import ScanCancelled, find_resources, resource_table, table_size
+from .textures import png_bytes, temp_path_for, thumbnail
+
+
+cwd = os.getcwd()
+
+# directory -> (mtime, [(name, path, type), ...]), most recently used last.
+# A directory's mtime changes whenever an entry is added, removed or renamed,
+# so a listing is reused for as long as the mtime matches.
+DIR_CACHE_SIZE = 256
+dir_cache = collections.OrderedDict()
+
+def list_directory(directory_path):
+    mtime = os.stat(directory_path).st_mtime_ns
+    cached = dir_cache.get(directory_path)
+    if cached is not None and cached[0] == mtime:
+        dir_cache.move_to_end(directory_path)
+        return cached[1]
+    dirs = []
+    files = []
+    with os.scandir(directory_path) as it:
+        for entry in it:
+            if entry.is_dir():
+                dirs.append((entry.name, entry.path, "Zone"))
+            elif entry.name.endswith('perm.bin'):
+                files.append((entry.name, entry.path, "Resource"))
+            elif entry.name.endswith('temp.bin'):
+                files.append((entry.name, entry.path, "Texture"))
+    entries = sorted(dirs) + sorted(files)
+    dir_cache[directory_path] = (mtime, entries)
+    dir_cache.move_to_end(directory_path)
+    if len(dir_cache) > DIR_CACHE_SIZE:
+        dir_cache.popitem(last=False)
+    return entries
+
+def insert_entries(entries, start, node):
+    end = start + PAGE_SIZE
+    for name, path, type in entries[start:end]:
+        tree.insert(node, 'end', text=name, values=(path, type))
+    if end < len(entries):
+        more = tree.insert(node, 'end', text=f"... {len(entries) - end} more", values=("", "More"))
+        pending[node] = (functools.partial(insert_entries, entries, end), more)
+
+def populate_tree_with_directories(directory_path):
+    drop_scan()
+    clear_tree()
+    insert_entries(list_directory(directory_path), 0, '')
+
+def open_single_file():
+    file_path = filedialog.askopenfilename(title="Select a perm.bin file", filetypes=[("BIN files", "*.bin")])
+    if file_path:
+        start_scan(file_path)
+
+# Resource groups go in collapsed, each with a placeholder child. Their rows
+# are only inserted when the group is opened, PAGE_SIZE at a time, so a zone
+# with hundreds of thousands of resources paints as fast as a small one.
+PAGE_SIZE = 500
+
+# node -> (function that inserts its children, placeholder child)
+pending = {}
+# res_name -> (group node, the group's (offset, detail) list)
+groups = {}
+# texture node -> offset of its header in the perm.bin
+texture_nodes = {}
+
+def clear_tree():
+    tree.delete(*tree.get_children())
+    pending.clear()
+    groups.clear()
+    texture_nodes.clear()
+
+def add_lazy(parent, text, fill, values=()):
+    node = tree.insert(parent, 'end', text=text, values=values)
+    pending[node] = (fill, tree.insert(node, 'end', text="Loading..."))
+    return node
+
+def expand(node):
+    fill, placeholder = pending.pop(node)
+    tree.delete(placeholder)
+    fill(node)
+
+def insert_texture_properties(offset, detail, node):
+    tree.insert(node, 'end', text=f"Offset: {offset}")
+    properties = detail.split(', ')
+    for prop in properties[1:]:
+        tree.insert(node, 'end', text=prop)
+
+def insert_page(res_name, offsets, start, node):
+    end = start + PAGE_SIZE
+    for offset, detail in offsets[start:end]:
+        if res_name == "Texture":
+            name = detail.split(', ')[0].split(': ')[1]
+            texture_nodes[add_lazy(node, name, functools.partial(insert_texture_properties, offset, detail))] = offset
+        else:
+            tree.insert(node, 'end', text=f"Offset: {offset}")
+    if end < len(offsets):
+        more = tree.insert(node, 'end', text=f"... {len(offsets) - end} more", values=("", "More"))
+        pending[node] = (functools.partial(insert_page, res_name, offsets, end), more)
+
+def display_resources(results):
+    clear_tree()
+    merge_resources(results)
+
+def merge_resources(results):
+    # add newly found resources, groups that are already shown just grow
+    for res_name, new_offsets in results.items():
+        if res_name not in groups:
+            offsets = list(new_offsets)
+            node = add_lazy('', f"{res_name} ({len(offsets)})", functools.partial(insert_page, res_name, offsets, 0))
+            groups[res_name] = (node, offsets)
+            continue
+        node, offsets = groups[res_name]
+        shown = len(offsets)
+        offsets.extend(new_offsets)
+        tree.item(node, text=f"{res_name} ({len(offsets)})")
+        if node not in pending:
+            # every row was already inserted, the new ones go behind a "more" row
+            more = tree.insert(node, 'end', text=f"... {len(offsets) - shown} more", values=("", "More"))
+            pending[node] = (functools.partial(insert_page, res_name, offsets, shown), more)
+        else:
+            fill, placeholder = pending[node]
+            if tree.item(placeholder, "values"):
+                tree.item(placeholder, text=f"... {len(offsets) - fill.args[2]} more")
+
+def on_tree_open(event):
+    node = tree.focus()
+    if node in pending and tree.get_children(node)[:1] == (pending[node][1],):
+        expand(node)
+
+def open_directory():
+    directory_path = filedialog.askdirectory(title="Select a directory containing perm.bin files")
+    if directory_path:
+        populate_tree_with_directories(directory_path)
+        update_directory_bar(directory_path)
+
+def update_directory_bar(path):
+    directory_bar.config(text=path)
+
+def go_back():
+    parent_directory = os.path.dirname(directory_bar.cget("text"))
+    if os.path.exists(parent_directory):
+        populate_tree_with_directories(parent_directory)
+        update_directory_bar(parent_directory)
+
+# Searches go to the catalog (catalog.py build) of the directory being shown
+# or its nearest parent; results are rows that open their perm.bin.
+SEARCH_LIMIT = 1000
+
+def search_catalog(event=None):
+    query = search_entry.get().strip()
+    if not query:
+        return
+    db_path = find_catalog(directory_bar.cget("text") or cwd)
+    if db_path is None:
+        status_bar.config(text=f"No {CATALOG_NAME} found, build one with catalog.py build <directory>")
+        return
+    start = time.perf_counter()
+    try:
+        rows = [(f"{name} ({TEXTURE_FORMATS.get(format, 'Unknown')} {width}x{height}) at {offset} in {perm}", perm)
+                for perm, temp, offset, name, format, width, height, raw_offset, raw_size
+                in texture_locations(db_path, query, SEARCH_LIMIT)]
+        try:
+            resource_id = int(query, 0)
+        except ValueError:
+            resource_id = None
+        if resource_id is not None:
+            rows += [(f"{type_name} {resource_id} at {offset} in {perm}", perm)
+                     for perm, offset, type_name in resource_locations(db_path, resource_id)]
+    except sqlite3.Error as e:
+        status_bar.config(text=f"Search failed: {e}")
+        return
+    drop_scan()
+    clear_tree()
+    for text, perm in rows:
+        tree.insert('', 'end', text=text, values=(perm, "Resource"))
+    status_bar.config(text=f"{len(rows)} results for {query} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+def display_perm_bin_contents(file_path):
+    start_scan(file_path)
+
+# Scans run on a worker thread. It posts (scan id, kind, payload) messages to
+# scan_queue, which the Tk loop drains every SCAN_POLL_MS; messages from a
+# scan that has since been replaced, or left for a directory listing or
+# search results, are dropped.
+SCAN_POLL_MS = 50
+scan_queue = queue.Queue()
+scan_state = {'id': 0, 'cancel': None, 'path': None, 'key': None}
+
+# Parsed tables of recently opened files, keyed by (path, size, mtime) so an
+# edited file is scanned again.
+RESULT_CACHE_BUDGET = 256 * 2**20
+result_cache = LRUCache(RESULT_CACHE_BUDGET, table_size)
+
+def cache_key(file_path):
+    st = os.stat(file_path)
+    return (os.path.abspath(file_path), st.st_size, st.st_mtime_ns)
+
+def run_scan(scan_id, file_path, cancel):
+    def progress(scanned, size, hits, textures):
+        if cancel.is_set():
+            raise ScanCancelled()
+        scan_queue.put((scan_id, 'progress', (scanned, size, resource_table(hits, textures))))
+
+    try:
+        results = find_resources(file_path, progress=progress)
+        scan_queue.put((scan_id, 'done', results))
+    except ScanCancelled:
+        scan_queue.put((scan_id, 'cancelled', None))
+    except Exception as e:
+        scan_queue.put((scan_id, 'error', e))
+
+def start_scan(file_path):
+    cancel_scan()
+    clear_tree()
+    try:
+        key = cache_key(file_path)
+    except OSError as e:
+        status_bar.config(text=f"Cannot open {file_path}: {e}")
+        return
+    results = result_cache.get(key)
+    if results is not None:
+        scan_state.update(id=scan_state['id'] + 1, path=file_path, key=None)
+        display_resources(results)
+        progress_bar.config(value=100)
+        status_bar.config(text=f"{file_path}: {sum(len(o) for o in results.values())} resources ({result_cache.stats()})")
+        return
+    cancel = threading.Event()
+    scan_state.update(id=scan_state['id'] + 1, cancel=cancel, path=file_path, key=key)
+    progress_bar.config(value=0)
+    cancel_button.config(state='normal')
+    status_bar.config(text=f"Scanning {file_path}")
+    threading.Thread(target=run_scan, args=(scan_state['id'], file_path, cancel), daemon=True).start()
+
+def cancel_scan():
+    if scan_state['cancel'] is not None:
+        scan_state['cancel'].set()
+        scan_state['cancel'] = None
+        cancel_button.config(state='disabled')
+
+def drop_scan():
+    # the tree is about to show something other than the scanned file, its
+    # queued progress and results must not be merged into that
+    cancel_scan()
+    scan_state.update(id=scan_state['id'] + 1, path=None, key=None)
+
+def poll_scan():
+    try:
+        while True:
+            scan_id, kind, payload = scan_queue.get_nowait()
+            if scan_id != scan_state['id']:
+                continue
+            if kind == 'progress':
+                scanned, size, results = payload
+                progress_bar.config(value=100 * scanned / size if size else 100)
+                status_bar.config(text=f"Scanning {scan_state['path']}: {scanned // 2**20} / {size // 2**20} MB")
+                merge_resources(results)
+                continue
+            if kind == 'done':
+                if not groups:
+                    # loaded from the index sidecar, nothing was streamed
+                    merge_resources(payload)
+                result_cache.put(scan_state['key'], payload)
+                progress_bar.config(value=100)
+                status_bar.config(text=f"{scan_state['path']}: {sum(len(o) for o in payload.values())} resources ({result_cache.stats()})")
+            elif kind == 'cancelled':
+                status_bar.config(text=f"Scan of {scan_state['path']} cancelled")
+            else:
+                status_bar.config(text=f"Scan of {scan_state['path']} failed: {payload}")
+            scan_state['cancel'] = None
+            cancel_button.config(state='disabled')
+    except queue.Empty:
+        pass
+    root.after(SCAN_POLL_MS, poll_scan)
+
+# Texture previews are decoded on their own worker thread from the pixel data
+# in the temp.bin next to the open perm.bin. Only the newest request is worked
+# on, the ones that pile up while the selection moves are dropped. Finished
+# thumbnails are kept as png bytes in memory and on disk.
+THUMB_SIZE = 256
+THUMB_MEMORY_BUDGET = 32 * 2**20
+THUMB_DISK_BUDGET = 256 * 2**20
+thumb_memory = LRUCache(THUMB_MEMORY_BUDGET, len)
+thumb_disk = DiskCache(os.path.join(os.path.expanduser('~'), '.cache', 'xiasi', 'thumbnails'), THUMB_DISK_BUDGET)
+thumb_requests = queue.Queue()
+thumb_results = queue.Queue()
+preview_state = {'key': None, 'image': None}
+
+def render_thumbnail(perm_path, temp_path, offset):
+    with mapped(perm_path) as data:
+        header = parse_texture_header(data, offset)
+    if header is None:
+        return None
+    with mapped(temp_path) as data:
+        rgba = thumbnail(data, header, THUMB_SIZE)
+    return None if rgba is None else png_bytes(rgba, 1)
+
+def run_thumbnails():
+    while True:
+        request = thumb_requests.get()
+        while not thumb_requests.empty():
+            request = thumb_requests.get_nowait()
+        key, perm_path, temp_path, offset = request
+        png = thumb_disk.get(key)
+        if png is None:
+            try:
+                png = render_thumbnail(perm_path, temp_path, offset)
+            except Exception as e:
+                thumb_results.put((key, None, e))
+                continue
+            if png is not None:
+                thumb_disk.put(key, png)
+        thumb_results.put((key, png, None))
+
+def show_preview(png):
+    image = tk.PhotoImage(data=base64.b64encode(png))
+    preview_state['image'] = image
+    preview_label.config(image=image, text="")
+
+def request_preview(node):
+    offset = texture_nodes.get(node, texture_nodes.get(tree.parent(node)))
+    if offset is None:
+        return
+    perm_path = scan_state['path']
+    temp_path = temp_path_for(perm_path)
+    if temp_path is None:
+        preview_state['key'] = None
+        preview_label.config(image="", text="No temp.bin next to this file")
+        return
+    try:
+        key = cache_key(perm_path) + cache_key(temp_path) + (offset, THUMB_SIZE)
+    except OSError as e:
+        preview_state['key'] = None
+        preview_label.config(image="", text=f"No preview: {e}")
+        return
+    preview_state['key'] = key
+    png = thumb_memory.get(key)
+    if png is not None:
+        show_preview(png)
+        return
+    preview_label.config(image="", text="Decoding...")
+    thumb_requests.put((key, perm_path, temp_path, offset))
+
+def poll_thumbnails():
+    try:
+        while True:
+            key, png, error = thumb_results.get_nowait()
+            if png is not None:
+                thumb_memory.put(key, png)
+            if key != preview_state['key']:
+                continue
+            if png is not None:
+                show_preview(png)
+            else:
+                preview_label.config(image="", text=f"No preview: {error}" if error else "No preview")
+    except queue.Empty:
+        pass
+    root.after(SCAN_POLL_MS, poll_thumbnails)
+
+def on_tree_select(event):
+    selection = tree.selection()
+    if selection:
+        request_preview(selection[0])
+
+def on_tree_click(event):
+    item = tree.selection()[0]
+    values = tree.item(item, "values")
+    if len(values) != 2:
+        return
+    path, type = values
+    if type == "More":
+        expand(tree.parent(item))
+    elif type == "Zone":
+        populate_tree_with_directories(path)
+        update_directory_bar(path)
+    elif type == "Resource":
+        display_perm_bin_contents(path)
+
+def main():
+    global root, directory_bar, cancel_button, progress_bar, search_entry, status_bar, preview_label, tree
+
+    root = tk.Tk()
+    root.title("Xiasi")
+    root.geometry("1920x1080")
+
+    directory_bar = tk.Label(root, text="", anchor="w")
+    directory_bar.pack(fill='x', padx=10, pady=5)
+
+    menu_bar = tk.Menu(root)
+    file_menu = tk.Menu(menu_bar, tearoff=0)
+    menu_bar.add_cascade(label="File", menu=file_menu)
+    file_menu.add_command(label="Open perm.bin File", command=open_single_file)
+    file_menu.add_command(label="Open Directory", command=open_directory)
+    root.config(menu=menu_bar)
+
+    button_frame = tk.Frame(root)
+    button_frame.pack(pady=5)
+    back_button = tk.Button(button_frame, text="Back", command=go_back)
+    back_button.pack(side='left', padx=5)
+    cancel_button = tk.Button(button_frame, text="Cancel", command=cancel_scan, state='disabled')
+    cancel_button.pack(side='left', padx=5)
+    progress_bar = ttk.Progressbar(button_frame, orient='horizontal', length=300, mode='determinate', maximum=100)
+    progress_bar.pack(side='left', padx=5)
+    search_entry = tk.Entry(button_frame, width=40)
+    search_entry.pack(side='left', padx=5)
+    search_entry.bind("<Return>", search_catalog)
+    search_button = tk.Button(button_frame, text="Find", command=search_catalog)
+    search_button.pack(side='left', padx=5)
+
+    status_bar = tk.Label(root, text="", anchor="w")
+    status_bar.pack(side='bottom', fill='x', padx=10, pady=2)
+
+    tree_frame = tk.Frame(root)
+    tree_frame.pack(expand=True, fill='both')
+    preview_label = tk.Label(tree_frame, text="", anchor='n')
+    preview_label.pack(side='right', fill='y', padx=10)
+    tree = ttk.Treeview(tree_frame, columns=("Path", "Type"), show='tree')
+    tree.pack(side='left', expand=True, fill='both')
+    tree.bind("<Double-1>", on_tree_click)
+    tree.bind("<<TreeviewOpen>>", on_tree_open)
+    tree.bind("<<TreeviewSelect>>", on_tree_select)
+
+    scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+    scrollbar.pack(side='right', fill='y')
+    tree.configure(yscrollcommand=scrollbar.set)
+
+    threading.Thread(target=run_thumbnails, daemon=True).start()
+    root.after(SCAN_POLL_MS, poll_scan)
+    root.after(SCAN_POLL_MS, poll_thumbnails)
+    root.mainloop()
\ No newline at end of file
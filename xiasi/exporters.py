@@ -0,0 +1,230 @@
+import json
+import os
+
+from .instrument import count, timer
+
+# Every exporter writes one model: float32 (n, 3) positions, float32 (n, 2)
+# UVs or None, and a list of (name, indices) submeshes sharing that vertex
+# buffer, of which the full triangles are written. A plain mesh is a single
+# submesh named None. Output only depends on the arrays, so re-exporting the
+# same input gives the same bytes. Exporters return the list of files they
+# wrote. Text is formatted and written EXPORT_ROWS rows at a time and glTF
+# buffers go to disk as they are added, so the memory an export needs beyond
+# its input arrays stays flat however large the mesh.
+
+EXPORT_ROWS = 1 << 16
+
+
+def _text(values):
+    # repr each distinct value once, decoded streams repeat a lot of them.
+    # Grouping is by bit pattern so -0.0 keeps its sign.
+    import numpy as np
+
+    flat = np.ascontiguousarray(values).ravel()
+    if flat.dtype.kind != 'f':
+        return flat.tolist()
+    bits, inverse = np.unique(flat.view(f'u{flat.itemsize}'), return_inverse=True)
+    text = np.array([repr(value) for value in bits.view(flat.dtype).tolist()], dtype=object)
+    return text[inverse].tolist()
+
+
+def _rows(values, prefix=""):
+    # one formatting pass per block instead of an f-string per value
+    width = values.shape[1]
+    line = prefix + " ".join(["%s"] * width) + "\n"
+    for start in range(0, len(values), EXPORT_ROWS):
+        block = values[start:start + EXPORT_ROWS]
+        with timer('export.format'):
+            text = (line * len(block)) % tuple(_text(block))
+        yield text
+
+
+def _triangles(indices):
+    return indices[:len(indices) // 3 * 3].reshape(-1, 3)
+
+
+def _has_uvs(positions, uvs):
+    return uvs is not None and 0 < len(uvs) == len(positions)
+
+
+def _write_text(path, parts):
+    # parts is an iterable of strings, formatted while it is written
+    chars = 0
+    with timer('export.write'):
+        with open(path, 'w') as output_file:
+            for text in parts:
+                output_file.write(text)
+                chars += len(text)
+    count('export.files')
+    count('export.chars', chars)
+
+
+def _txt_parts(positions, uvs, submeshes):
+    import numpy as np
+
+    vertices = np.hstack([positions, uvs]) if _has_uvs(positions, uvs) else positions
+    yield "vertex start\n"
+    if len(vertices):
+        yield from _rows(vertices)
+    else:
+        yield "\n"
+    yield "vertex end\n"
+    for name, indices in submeshes:
+        if name is not None:
+            yield f"mesh {name}\n"
+        yield "index start\n"
+        yield from _rows(_triangles(indices))
+        yield "index end\n"
+
+
+def write_txt(path, positions, uvs, submeshes):
+    _write_text(path, _txt_parts(positions, uvs, submeshes))
+    return [path]
+
+
+def _obj_parts(positions, uvs, submeshes):
+    yield from _rows(positions, "v ")
+    if _has_uvs(positions, uvs):
+        yield from _rows(uvs, "vt ")
+        face = "f %d/%d %d/%d %d/%d\n"
+        repeat = 2
+    else:
+        face = "f %d %d %d\n"
+        repeat = 1
+    for name, indices in submeshes:
+        if name is not None:
+            yield f"o {name}\n"
+        triangles = _triangles(indices)
+        for start in range(0, len(triangles), EXPORT_ROWS):
+            block = triangles[start:start + EXPORT_ROWS].astype('i8') + 1
+            with timer('export.format'):
+                text = (face * len(block)) % tuple(block.repeat(repeat, axis=1).ravel().tolist())
+            yield text
+
+
+def write_obj(path, positions, uvs, submeshes):
+    _write_text(path, _obj_parts(positions, uvs, submeshes))
+    return [path]
+
+
+class GltfBuffer:
+    """The bufferViews and accessors of a glTF .bin that arrays are written
+    to as they are added. Arrays must not be empty, glTF has no zero-length
+    views."""
+
+    def __init__(self, file):
+        self.file = file
+        self.size = 0
+        self.views = []
+        self.accessors = []
+
+    def add(self, array, component_type, kind, target, bounds=False):
+        """Append array, returns the index of its accessor."""
+        import numpy as np
+
+        self.file.write(bytes(-self.size % 4))
+        self.size += -self.size % 4
+        data = np.ascontiguousarray(array)
+        self.views.append({'buffer': 0, 'byteOffset': self.size, 'byteLength': data.nbytes, 'target': target})
+        accessor = {'bufferView': len(self.views) - 1, 'componentType': component_type,
+                    'count': len(array), 'type': kind}
+        if bounds:
+            accessor['min'] = array.min(axis=0).tolist()
+            accessor['max'] = array.max(axis=0).tolist()
+        self.accessors.append(accessor)
+        self.file.write(data)
+        self.size += data.nbytes
+        return len(self.accessors) - 1
+
+    def add_positions(self, positions):
+        return self.add(positions.astype('<f4'), 5126, 'VEC3', 34962, bounds=True)
+
+    def add_uvs(self, uvs):
+        return self.add(uvs.astype('<f4'), 5126, 'VEC2', 34962)
+
+    def add_indices(self, indices):
+        # 65535 is the primitive restart value for unsigned short
+        if indices.max() < 0xFFFF:
+            return self.add(indices.astype('<u2'), 5123, 'SCALAR', 34963)
+        return self.add(indices.astype('<u4'), 5125, 'SCALAR', 34963)
+
+    def document(self, doc, uri):
+        """Add the accessors, views and buffer to a glTF doc."""
+        doc['accessors'] = self.accessors
+        doc['bufferViews'] = self.views
+        doc['buffers'] = [{'byteLength': self.size, 'uri': uri}]
+
+
+def write_gltf(path, positions, uvs, submeshes):
+    """glTF 2.0 with a sidecar .bin holding the raw arrays, the submeshes are
+    one mesh and node each over shared vertex accessors."""
+    written = [path]
+    doc = {'asset': {'version': '2.0', 'generator': 'Xiasi'}, 'scene': 0, 'scenes': [{'nodes': []}]}
+    if len(positions):
+        bin_path = os.path.splitext(path)[0] + '.bin'
+        doc['meshes'] = []
+        doc['nodes'] = []
+        with timer('export.write'), open(bin_path, 'wb') as bin_file:
+            buffer = GltfBuffer(bin_file)
+            attributes = {'POSITION': buffer.add_positions(positions)}
+            if _has_uvs(positions, uvs):
+                attributes['TEXCOORD_0'] = buffer.add_uvs(uvs)
+            for name, indices in submeshes:
+                primitive = {'attributes': attributes, 'mode': 4}
+                triangles = _triangles(indices).ravel()
+                if len(triangles):
+                    primitive['indices'] = buffer.add_indices(triangles)
+                mesh = {'primitives': [primitive]}
+                node = {'mesh': len(doc['meshes'])}
+                if name is not None:
+                    mesh['name'] = node['name'] = str(name)
+                doc['meshes'].append(mesh)
+                doc['nodes'].append(node)
+        count('export.files')
+        count('export.bytes', buffer.size)
+        written.append(bin_path)
+        doc['scenes'][0]['nodes'] = list(range(len(doc['nodes'])))
+        buffer.document(doc, os.path.basename(bin_path))
+
+    _write_text(path, [json.dumps(doc, sort_keys=True, separators=(',', ':'))])
+    return written
+
+
+def compact(positions, uvs, indices):
+    """Just the vertices indices uses, in first-index order, with the indices
+    remapped onto them. For submeshes that have to stand on their own.
+    Triangles indexing past the end of positions are dropped."""
+    import numpy as np
+
+    if len(indices) and indices.max() >= len(positions):
+        triangles = _triangles(indices)
+        indices = triangles[(triangles < len(positions)).all(axis=1)].ravel()
+    used, first, remapped = np.unique(indices, return_index=True, return_inverse=True)
+    # np.unique sorts by value, renumber so vertices keep first-use order
+    order = np.argsort(first, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    used = used[order]
+    return (positions[used], uvs[used] if _has_uvs(positions, uvs) else uvs,
+            rank[remapped.ravel()].astype(np.uint32))
+
+
+EXPORTERS = {
+    'txt': ('.txt', write_txt),
+    'obj': ('.obj', write_obj),
+    'gltf': ('.gltf', write_gltf),
+}
+
+
+def mesh_path(base, fmt='txt'):
+    return base + EXPORTERS[fmt][0]
+
+
+def export_model(path, positions, uvs, submeshes, fmt='txt'):
+    """Write submeshes over one shared vertex buffer with the fmt exporter,
+    returns the paths of the files written."""
+    return EXPORTERS[fmt][1](path, positions, uvs, submeshes)
+
+
+def export_mesh(path, positions, uvs, indices, fmt='txt'):
+    return export_model(path, positions, uvs, [(None, indices)], fmt)
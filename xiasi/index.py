@@ -0,0 +1,179 @@
+import os
+import struct
+import sys
+from collections import namedtuple
+
+from .binreader import mapped
+from .instrument import count, timer
+from .chunks import ChainError, Chunk, iter_chunks
+from .resources import resource_types, TEXTURE, TextureHeader, parse_texture_header, iter_type_ids, texture_detail
+
+# sidecar written next to the bin file, reused as long as size and mtime match
+INDEX_SUFFIX = '.xidx'
+INDEX_VERSION = 1
+
+_HEADER = struct.Struct('<4sIQQIII')
+_CHUNK = struct.Struct('<IQIQI')
+_HIT = struct.Struct('<IQ')
+_TEXTURE = struct.Struct('<QIHHIIIH')
+
+FileIndex = namedtuple('FileIndex', 'size mtime chunks hits textures')
+
+
+class ScanCancelled(Exception):
+    pass
+
+
+def build_index(file_path, progress=None):
+    """Scan file_path once and return its FileIndex.
+
+    chunks is the walked chunk chain (empty or partial if the file is not a
+    well formed chunk chain, as with temp.bin), hits maps every known type id
+    to the offsets it occurs at and textures holds the parsed texture headers.
+
+    progress, if given, is called after every scanned block with (scanned,
+    size, hits, textures) for just that block. Raising ScanCancelled from it
+    stops the scan.
+    """
+    stat = os.stat(file_path)
+    with mapped(file_path) as data:
+        chunks = []
+        with timer('index.walk'):
+            try:
+                for chunk in iter_chunks(data):
+                    chunks.append(chunk)
+            except ChainError:
+                pass
+        count('index.chunks', len(chunks))
+        count('index.bytes_scanned', stat.st_size)
+
+        hits = {}
+        textures = []
+        with timer('index.scan'):
+            for scanned, offsets, res_types in iter_type_ids(data):
+                block_hits = {}
+                block_textures = []
+                for offset, res_type in zip(offsets, res_types):
+                    block_hits.setdefault(res_type, []).append(offset)
+                    if res_type == TEXTURE:
+                        header = parse_texture_header(data, offset)
+                        if header is not None:
+                            block_textures.append(header)
+                for res_type, block_offsets in block_hits.items():
+                    hits.setdefault(res_type, []).extend(block_offsets)
+                textures.extend(block_textures)
+                if progress is not None:
+                    progress(scanned, stat.st_size, block_hits, block_textures)
+        count('index.textures', len(textures))
+    return FileIndex(stat.st_size, stat.st_mtime_ns, chunks, hits, textures)
+
+
+def save_index(file_path, index):
+    n_hits = sum(len(offsets) for offsets in index.hits.values())
+    parts = [_HEADER.pack(b'XIDX', INDEX_VERSION, index.size, index.mtime,
+                          len(index.chunks), n_hits, len(index.textures))]
+    parts.extend(_CHUNK.pack(*chunk) for chunk in index.chunks)
+    for res_type, offsets in index.hits.items():
+        parts.extend(_HIT.pack(res_type, offset) for offset in offsets)
+    for texture in index.textures:
+        name = texture.name.encode('utf-8')
+        parts.append(_TEXTURE.pack(texture.offset, texture.format, texture.height, texture.width,
+                                   texture.type2, texture.raw_offset, texture.raw_size, len(name)))
+        parts.append(name)
+    tmp_path = file_path + INDEX_SUFFIX + '.tmp'
+    with open(tmp_path, 'wb') as sidecar:
+        sidecar.write(b''.join(parts))
+    os.replace(tmp_path, file_path + INDEX_SUFFIX)
+
+
+def load_index(file_path):
+    """Return the sidecar FileIndex for file_path, or None if it is missing or stale."""
+    try:
+        stat = os.stat(file_path)
+        with open(file_path + INDEX_SUFFIX, 'rb') as sidecar:
+            data = sidecar.read()
+    except OSError:
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, size, mtime, n_chunks, n_hits, n_textures = _HEADER.unpack_from(data)
+    if magic != b'XIDX' or version != INDEX_VERSION or size != stat.st_size or mtime != stat.st_mtime_ns:
+        return None
+
+    try:
+        return _unpack_index(data, size, mtime, n_chunks, n_hits, n_textures)
+    except (struct.error, UnicodeDecodeError):
+        # truncated or garbled sidecar, rebuild it
+        return None
+
+
+def _unpack_index(data, size, mtime, n_chunks, n_hits, n_textures):
+    pos = _HEADER.size
+    end = pos + n_chunks * _CHUNK.size
+    chunks = [Chunk(*fields) for fields in _CHUNK.iter_unpack(data[pos:end])]
+
+    pos, end = end, end + n_hits * _HIT.size
+    hits = {}
+    for res_type, offset in _HIT.iter_unpack(data[pos:end]):
+        hits.setdefault(res_type, []).append(offset)
+
+    pos = end
+    textures = []
+    for _ in range(n_textures):
+        offset, fmt, height, width, type2, raw_offset, raw_size, name_len = _TEXTURE.unpack_from(data, pos)
+        pos += _TEXTURE.size
+        name = data[pos:pos + name_len].decode('utf-8')
+        pos += name_len
+        textures.append(TextureHeader(offset, name, fmt, height, width, type2, raw_offset, raw_size))
+    if pos != len(data):
+        raise struct.error("trailing bytes in index")
+    return FileIndex(size, mtime, chunks, hits, textures)
+
+
+def file_index(file_path, cache=True, progress=None):
+    """Load the sidecar index for file_path, building and saving it when needed.
+
+    progress is passed on to build_index, it isn't called for a sidecar load.
+    """
+    with timer('index.load'):
+        index = load_index(file_path) if cache else None
+    if index is None:
+        with timer('index.build'):
+            index = build_index(file_path, progress)
+        if cache:
+            try:
+                save_index(file_path, index)
+            except OSError:
+                # read-only game directories just don't get a sidecar
+                pass
+    return index
+
+
+def resource_table(hits, textures):
+    """{res_name: [(offset, detail), ...]} for the dawg browser, in
+    resource_types order."""
+    results = {}
+    for res_type, res_name in resource_types.items():
+        if res_type == TEXTURE:
+            offsets = [(texture.offset, texture_detail(texture)) for texture in textures]
+        else:
+            offsets = [(offset, f"Offset: {offset}") for offset in hits.get(res_type, ())]
+        if offsets:
+            results[res_name] = offsets
+    return results
+
+
+def table_size(results):
+    """Rough number of bytes held by a resource_table result."""
+    size = sys.getsizeof(results)
+    for res_name, offsets in results.items():
+        size += sys.getsizeof(offsets)
+        for entry in offsets:
+            size += sys.getsizeof(entry) + sys.getsizeof(entry[0]) + sys.getsizeof(entry[1])
+    return size
+
+
+def find_resources(file_path, cache=True, progress=None):
+    index = file_index(file_path, cache, progress)
+    with timer('find_resources.table'):
+        return resource_table(index.hits, index.textures)
@@ -0,0 +1,105 @@
+import json
+import logging
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+
+# Counters and phase timers for the parsers. Everything is off until
+# enable() is called: count() is then a flag check and timer() hands back a
+# shared no-op context manager, so the hooks can stay on the hot paths.
+# Timers are inclusive, a phase that runs inside another counts towards both.
+
+enabled = False
+counters = Counter()
+timers = defaultdict(float)
+calls = Counter()
+
+_NULL = nullcontext()
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def reset():
+    counters.clear()
+    timers.clear()
+    calls.clear()
+
+
+def count(name, n=1):
+    if enabled:
+        counters[name] += n
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        timers[self.name] += time.perf_counter() - self.start
+        calls[self.name] += 1
+
+
+def timer(name):
+    return _Timer(name) if enabled else _NULL
+
+
+def report():
+    """Counters and timers so far as a JSON-serialisable dict."""
+    return {
+        'counters': dict(sorted(counters.items())),
+        'timers': {name: {'seconds': round(timers[name], 6), 'calls': calls[name]} for name in sorted(timers)},
+    }
+
+
+def merge(other):
+    """Add a report() from another process to this one's totals."""
+    counters.update(other['counters'])
+    for name, timing in other['timers'].items():
+        timers[name] += timing['seconds']
+        calls[name] += timing['calls']
+
+
+def write_report(path):
+    with open(path, 'w') as file:
+        json.dump(report(), file, indent=2)
+        file.write('\n')
+
+
+def add_arguments(parser):
+    """The logging and instrumentation options every command line shares."""
+    parser.add_argument('--log-level', default='warning', choices=('debug', 'info', 'warning', 'error'),
+                        help="diagnostics to show (default: warning)")
+    parser.add_argument('--stats', default=None, metavar='JSON', help="write counters and phase timings to JSON")
+    parser.add_argument('--profile', default=None, metavar='FILE', help="run under cProfile and save the stats to FILE")
+
+
+@contextmanager
+def from_args(args):
+    """Set up logging, counters and profiling as the add_arguments options
+    ask for, and write the report and profile when the block ends."""
+    logging.basicConfig(level=args.log_level.upper(), format='%(levelname)s %(name)s: %(message)s')
+    profiler = None
+    if args.stats:
+        reset()
+        enable()
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if args.stats:
+            write_report(args.stats)
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = '.xiasi_manifest.json'
+MANIFEST_VERSION = 1
+
+
+def content_hash(path, block_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        while True:
+            block = file.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """What the batch converter last produced for each input file.
+
+    Entries are keyed by the input's path relative to the manifest and hold
+    its size, mtime, content hash, the parser/format/version that ran and the
+    files written. An input counts as unchanged while size and mtime match,
+    or the content hash does after a touch.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        self.entries = {}
+        try:
+            with open(path) as file:
+                data = json.load(file)
+            if data.get('version') == MANIFEST_VERSION:
+                self.entries = data['entries']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def key(self, input_path):
+        return os.path.relpath(os.path.abspath(input_path), self.root)
+
+    def is_current(self, input_path, parser, fmt, version):
+        entry = self.entries.get(self.key(input_path))
+        if entry is None or (entry['parser'], entry['format'], entry['parser_version']) != (parser, fmt, version):
+            return False
+        try:
+            stat = os.stat(input_path)
+        except OSError:
+            return False
+        if stat.st_size != entry['size']:
+            return False
+        if not all(os.path.exists(os.path.join(self.root, output)) for output in entry['outputs']):
+            return False
+        if stat.st_mtime_ns != entry['mtime']:
+            if content_hash(input_path) != entry['hash']:
+                return False
+            entry['mtime'] = stat.st_mtime_ns
+        return True
+
+    def record(self, input_path, parser, fmt, version, digest, outputs):
+        stat = os.stat(input_path)
+        self.entries[self.key(input_path)] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'hash': digest,
+            'parser': parser,
+            'format': fmt,
+            'parser_version': version,
+            'outputs': sorted({os.path.relpath(os.path.abspath(output), self.root) for output in outputs}),
+        }
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump({'version': MANIFEST_VERSION, 'entries': self.entries}, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,133 @@
+import argparse
+import logging
+import os
+
+from .binreader import BinaryReader
+from .chunks import CHUNK_HEADER, ChainError, iter_chunks
+from .exporters import EXPORTERS, compact, export_mesh, mesh_path
+from .instrument import add_arguments, from_args, timer
+from .model import Model, Tables, read_mesh_records
+from .registry import Dispatcher
+from .streams import empty
+
+log = logging.getLogger(__name__)
+
+# bump when the output of this parser changes, the batch converter
+# re-exports everything recorded with an older version
+PARSER_VERSION = 2
+
+# split: every submesh file carries the whole pooled vertex buffer
+# shared: one model file, the pooled buffer once plus each submesh's indices
+# compact: every submesh file carries only the vertices it uses, remapped
+LAYOUTS = ('split', 'shared', 'compact')
+
+handlers = Dispatcher()
+
+@handlers.register('ModelData')
+def mesh_info(chunk, g, meshes, tables):
+    t = chunk.offset + CHUNK_HEADER.size
+    for m, va in enumerate(read_mesh_records(g.data, chunk.data_offset)):
+        meshes.append((t, m, va))
+
+@handlers.register('Buffer')
+def buffer(chunk, g, meshes, tables):
+    tables.add_stream(g.data, chunk)
+
+def bin_parser(filename, fmt='txt', layout='split', strict=False):
+    with open(filename, 'rb') as f, BinaryReader(f) as g:
+        outputs = []
+        tables = Tables()
+        streams = tables.streams
+        meshes = []
+
+        # a single walk records the mesh info entries, they are resolved once
+        # every stream in the file is known
+        with timer('bin_parser.walk'):
+            try:
+                for chunk in iter_chunks(g.data):
+                    g.seek(chunk.data_offset)
+                    handlers.dispatch(chunk, g, meshes, tables)
+            except ChainError as e:
+                if strict:
+                    raise
+                log.warning("%s: %s, stopping there", filename, e)
+
+        positions = empty(3)
+        uvs = empty(2)
+        for t, m, va in meshes:
+            if va[15] in streams and not len(positions):
+                # pool verts, character expects indices to align with the entire vertex buffer for the entire model
+                log.debug("Number of vertices: %d", streams[va[15]].count)
+
+                with timer('bin_parser.decode'):
+                    positions = tables.positions(g.data, va[15])
+
+            if va[23] in streams and not len(uvs):
+                log.debug("Number of UV pairs: %d", streams[va[23]].count)
+
+                with timer('bin_parser.decode'):
+                    uvs = tables.uvs(g.data, va[23])
+
+        if len(positions) != len(uvs):
+            log.warning("Number of UV pairs (%d) does not match number of vertices (%d) in file %s. Skipping UVs.",
+                        len(uvs), len(positions), filename)
+            uvs = empty(2)
+
+        model = Model(positions, uvs)
+        for t, m, va in meshes:
+            if va[11] in streams:
+                with timer('bin_parser.decode'):
+                    indices = tables.indices(g.data, va[11], va[29], va[29] + va[30] * 3)
+
+                if layout == 'shared':
+                    # named like the vehicle parser's files, m alone repeats across ModelData chunks
+                    model.add(f"offset_{t}_mesh_{m}", indices, va[3])
+                    continue
+
+                mesh_filename = mesh_path(f"{filename}_mesh_{m}", fmt)
+                log.debug("Writing mesh %d to %s", m, mesh_filename)
+                with timer('bin_parser.export'):
+                    if layout == 'compact':
+                        if len(indices) and indices.max() >= len(positions):
+                            log.warning("Mesh %d of %s indexes past its %d pooled vertices, dropping those triangles",
+                                        m, filename, len(positions))
+                        outputs.extend(export_mesh(mesh_filename, *compact(positions, uvs, indices), fmt))
+                    else:
+                        outputs.extend(export_mesh(mesh_filename, positions, uvs, indices, fmt))
+
+        if model.submeshes:
+            # the pooled buffer goes out once, each submesh is just its index range
+            model_filename = mesh_path(f"{filename}_model", fmt)
+            log.debug("Writing %d meshes to %s", len(model.submeshes), model_filename)
+            with timer('bin_parser.export'):
+                outputs.extend(model.export(model_filename, fmt))
+
+    return outputs
+
+def file_format_parser(filename, fmt='txt', layout='split', strict=False):
+    log.info("Parsing file: %s", filename)
+    model_id = os.path.basename(filename).split('.')[0]
+    dirname = os.path.dirname(filename)
+    ext = filename.split('.')[-1].lower()
+
+    if ext == 'bin':
+        return bin_parser(filename, fmt, layout, strict)
+    return []
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--format', choices=EXPORTERS, default='txt', help="mesh output format")
+    parser.add_argument('--layout', choices=LAYOUTS, default='split', help="how the pooled vertex buffer is written")
+    parser.add_argument('files', nargs='*', metavar='FILE',
+                        help="perm.bin files to convert (default: every *.perm.bin in the current directory)")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    filenames = args.files or sorted(name for name in os.listdir('.') if name.endswith('.perm.bin'))
+    with from_args(args):
+        for filename in filenames:
+            file_format_parser(filename, args.format, args.layout)
+
+
+if __name__ == "__main__":
+    main()
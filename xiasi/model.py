@@ -0,0 +1,172 @@
+import struct
+from collections import namedtuple
+
+from .exporters import export_model
+from .instrument import count
+from .streams import decode_indices, decode_positions, decode_uvs, empty
+
+# Parsed geometry and the per-file tables the mesh parsers share. Records
+# are namedtuples and the containers use __slots__, tables are keyed by the
+# integer resource id (vc[3]) and vertex data stays in numpy arrays, so a
+# model costs about what its raw streams do.
+
+# a Buffer chunk's data starts with a 32-uint record (v[3] stride, v[4] count)
+STREAM_HEADER = struct.Struct('<32I')
+# a ModelData chunk's data starts with 32 uints, vn[16] of them are meshes,
+# followed by that many self-relative offsets to 36-uint mesh records
+MODEL_HEADER = struct.Struct('<32I')
+MESH_RECORD = struct.Struct('<36I')
+# a Material chunk's data starts with 8 uints, vn[4] of them are properties
+MATERIAL_HEADER = struct.Struct('<8I')
+MATERIAL_PROPERTY = struct.Struct('<8I')
+# a BonePalette chunk's data starts with 8 uints (vn[1] bones) and 160 bytes
+BONE_HEADER = struct.Struct('<8I')
+BONE_SKIP = 160
+BONE_NAME_SIZE = 64
+
+# material property ids, the texture resource id is vp[6]
+DIFFUSE_MAP = 0xDCE06689
+SPECULAR_MAP = 0xACBC7A85
+
+Stream = namedtuple('Stream', 'resource_id stride count offset')
+Material = namedtuple('Material', 'resource_id diffuse specular')
+Submesh = namedtuple('Submesh', 'name indices material')
+
+
+def read_stream(data, chunk):
+    """The Stream record of a Buffer chunk, offset is where its elements start."""
+    v = STREAM_HEADER.unpack_from(data, chunk.data_offset)
+    count('read.bytes', STREAM_HEADER.size)
+    return Stream(chunk.resource_id, v[3], v[4], chunk.data_offset + STREAM_HEADER.size)
+
+
+def read_mesh_records(data, offset):
+    """The 36-uint mesh records of the ModelData whose data starts at offset."""
+    vn = MODEL_HEADER.unpack_from(data, offset)
+    off = offset + MODEL_HEADER.size
+    offsetlist = struct.unpack_from(f'<{vn[16]}I', data, off)
+    count('read.bytes', MODEL_HEADER.size + vn[16] * (4 + MESH_RECORD.size))
+    return [MESH_RECORD.unpack_from(data, m * 4 + off + offsetlist[m]) for m in range(vn[16])]
+
+
+def read_material(data, chunk):
+    """A Material chunk's diffuse and specular texture ids, None if unset."""
+    vn = MATERIAL_HEADER.unpack_from(data, chunk.data_offset)
+    diffuse = specular = None
+    count('read.bytes', MATERIAL_HEADER.size + vn[4] * MATERIAL_PROPERTY.size)
+    for pos in range(chunk.data_offset + MATERIAL_HEADER.size,
+                     chunk.data_offset + MATERIAL_HEADER.size + vn[4] * MATERIAL_PROPERTY.size,
+                     MATERIAL_PROPERTY.size):
+        vp = MATERIAL_PROPERTY.unpack_from(data, pos)
+        if vp[0] == DIFFUSE_MAP:
+            diffuse = vp[6]
+        if vp[0] == SPECULAR_MAP:
+            specular = vp[6]
+    return Material(chunk.resource_id, diffuse, specular)
+
+
+def read_bones(data, chunk):
+    """A BonePalette chunk's names as an 'S64' array and its four int16 * 2^-14
+    values per bone as a (n, 4) float32 array."""
+    import numpy as np
+
+    bones = BONE_HEADER.unpack_from(data, chunk.data_offset)[1]
+    count('read.bytes', BONE_HEADER.size + bones * (BONE_NAME_SIZE + 8))
+    pos = chunk.data_offset + BONE_HEADER.size + BONE_SKIP
+    names = np.frombuffer(data, dtype=f'S{BONE_NAME_SIZE}', count=bones, offset=pos).copy()
+    pos += bones * BONE_NAME_SIZE
+    weights = np.frombuffer(data, dtype='<i2', count=bones * 4, offset=pos).reshape(bones, 4)
+    return names, weights.astype(np.float32) * np.float32(2**-14)
+
+
+class Tables:
+    """The streams, materials and bones of one file, by resource id."""
+
+    __slots__ = ('streams', 'materials', 'bone_names', 'bone_weights')
+
+    def __init__(self):
+        self.streams = {}
+        self.materials = {}
+        self.bone_names = None
+        self.bone_weights = None
+
+    def add_stream(self, data, chunk):
+        stream = self.streams[chunk.resource_id] = read_stream(data, chunk)
+        return stream
+
+    def add_material(self, data, chunk):
+        material = self.materials[chunk.resource_id] = read_material(data, chunk)
+        return material
+
+    def add_bones(self, data, chunk):
+        names, weights = read_bones(data, chunk)
+        if self.bone_names is None:
+            self.bone_names, self.bone_weights = names, weights
+        else:
+            import numpy as np
+
+            self.bone_names = np.concatenate([self.bone_names, names])
+            self.bone_weights = np.concatenate([self.bone_weights, weights])
+
+    def positions(self, data, resource_id):
+        stream = self.streams[resource_id]
+        return decode_positions(data, stream.offset, stream.stride, stream.count)
+
+    def uvs(self, data, resource_id):
+        stream = self.streams[resource_id]
+        return decode_uvs(data, stream.offset, stream.stride, stream.count)
+
+    def indices(self, data, resource_id, start=0, stop=None):
+        stream = self.streams[resource_id]
+        return decode_indices(data, stream.offset, stream.count, start, stop)
+
+
+class Model:
+    """One vertex buffer and the submeshes drawn from it.
+
+    positions is (n, 3) float32, uvs (n, 2) float32 or None, every submesh's
+    indices a uint16 or uint32 array into the shared buffer.
+    """
+
+    __slots__ = ('positions', 'uvs', 'submeshes')
+
+    def __init__(self, positions=None, uvs=None):
+        self.positions = empty(3) if positions is None else positions
+        self.uvs = uvs
+        self.submeshes = []
+
+    def __len__(self):
+        return len(self.positions)
+
+    def add(self, name, indices, material=None):
+        self.submeshes.append(Submesh(name, indices, material))
+
+    @property
+    def nbytes(self):
+        size = self.positions.nbytes + sum(submesh.indices.nbytes for submesh in self.submeshes)
+        return size + (self.uvs.nbytes if self.uvs is not None else 0)
+
+    def merge(self, other):
+        """Append other's vertices and submeshes, its indices shifted past ours.
+
+        UVs are kept only when both sides have them or one side is empty.
+        """
+        import numpy as np
+
+        base = len(self.positions)
+        if not base:
+            self.uvs = other.uvs
+        elif self.uvs is not None and other.uvs is not None:
+            self.uvs = np.concatenate([self.uvs, other.uvs])
+        elif len(other):
+            self.uvs = None
+        self.positions = np.concatenate([self.positions, other.positions])
+        dtype = np.uint16 if len(self.positions) <= 0x10000 else np.uint32
+        for submesh in other.submeshes:
+            self.submeshes.append(submesh._replace(indices=(submesh.indices.astype(np.int64) + base).astype(dtype)))
+        return self
+
+    def export(self, path, fmt='txt'):
+        """Write every submesh over the shared buffer, returns the files written."""
+        return export_model(path, self.positions, self.uvs,
+                            [(submesh.name, submesh.indices) for submesh in self.submeshes], fmt)
@@ -0,0 +1,50 @@
+from . import instrument
+from .resources import resource_types
+
+# every type id is kept as the unsigned value read with '<I'
+type_names = resource_types
+type_ids = {name: type_id for type_id, name in resource_types.items()}
+
+
+def unsigned(type_id):
+    return type_id & 0xFFFFFFFF
+
+
+def type_id(type):
+    """Unsigned type id for a resource name or an id, signed or not."""
+    if isinstance(type, str):
+        return type_ids[type]
+    return unsigned(type)
+
+
+def type_name(type_id, default=None):
+    return type_names.get(unsigned(type_id), default)
+
+
+class Dispatcher:
+    """Chunk handlers keyed by unsigned type id.
+
+    Handlers are registered by resource name or id and called as
+    handler(chunk, *args) for every chunk of that type; chunks without a
+    handler are skipped. Dispatch is a single dict lookup per chunk.
+    """
+
+    def __init__(self):
+        self.handlers = {}
+
+    def register(self, type, handler=None):
+        """Register handler for type, or use as @dispatcher.register(type)."""
+        if handler is None:
+            return lambda handler: self.register(type, handler)
+        self.handlers[type_id(type)] = handler
+        return handler
+
+    def __contains__(self, type):
+        return type_id(type) in self.handlers
+
+    def dispatch(self, chunk, *args):
+        if instrument.enabled:
+            instrument.counters['chunks.' + type_name(chunk.type_id, f"{chunk.type_id:#010x}")] += 1
+        handler = self.handlers.get(chunk.type_id)
+        if handler is not None:
+            return handler(chunk, *args)
@@ -0,0 +1,205 @@
+import logging
+import struct
+from collections import namedtuple
+
+from .binreader import release
+
+log = logging.getLogger(__name__)
+
+resource_types = {
+    0x4BCE8537: "ActionTreeResource",
+    0x1BCFF4D5: "AlphaState",
+    0x8ACF9964: "Animation",
+    0x3D0EBC72: "AnimationGroupResource",
+    0xAF8870AB: "AudioFXSettings",
+    0x2C5C40A8: "BIGFile",
+    0x164013D5: "BIGFileNameLookup",
+    0x4F05B59A: "BSP",
+    0xE2C5C78C: "BSPDebugData",
+    0x80EF0B08: "BeamSettings",
+    0xE691BB97: "BlendTreeResource",
+    0x982456DB: "BonePalette",
+    0x7A971479: "Buffer",
+    0x45E061F6: "BufferD3DResource",
+    0xE445B80C: "ChunkFileFatIndex",
+    0x7040F7D2: "ChunkFileIndex",
+    0x06526B66: "Cloud",
+    0xD49B8DA4: "CloudScene",
+    0xA0B2CC13: "CollisionInstance",
+    0xBD226A08: "CollisionMeshBundle",
+    0x9D6378CC: "CoronaFlareSettings",
+    0x5DEB3457: "CoverData",
+    0xDCAEC503: "DecalSettings",
+    0xE5150CC0: "DynamicCoverData",
+    0x7117991B: "DynamicCoverGroupBundle",
+    0x230C8A9C: "DynamicLightGroupSettings",
+    0x8D0E8333: "DynamicLightSettings",
+    0xD9B10F14: "EffectEmitterSettings",
+    0x77554FC5: "FXForceSettings",
+    0x12289ADB: "FXSettings",
+    0xF40E78D9: "FarGroundLayout",
+    0x83574C18: "FlareSettings",
+    0x2A1BE612: "Font",
+    0x52A8963A: "GeoSettings",
+    0xAEDF1081: "ImposterGroup",
+    0x7480E00F: "LightGroup",
+    0xB4AEE124: "LightningSettings",
+    0x15506061: "Locators",
+    0xF5F8516F: "Material",
+    0xEB9FE716: "MaterialTable",
+    0x6DF963B3: "ModelData",
+    0xF2700F96: "eVertexDecl_UVN", #endian swapped?
+    0x9BA68DBC: "eVertexDecl_UVNT",
+    0x911E1A51: "eVertexDecl_UVNTC",
+    0x78921EA0: "eVertexDecl_UV2NTC",
+    0x276B9567: "eVertexDecl_Skinned",
+    0xE234EF7A: "eVertexDecl_VehicleUVNTC",
+    0x7E0D7533: "eVertexDecl_SlimUV",
+    0xAC5D89E2: "eVertexDecl_SkinnedUVNT",
+    0x02CD0C47: "MorphTargets",
+    0xE9453F67: "MovieResourceData",
+    0xC762C801: "NISSpatialData",
+    0xDD3C7B19: "NavMeshData",
+    0xBDE53ECA: "ParkourContainer",
+    0x12D3A53D: "ParkourContainerBundle",
+    0xC31501A5: "ParkourInstance",
+    0xD05B6976: "ParticleEmitterSettings",
+    0x5B9BF81E: "PropertySet",
+    0xB27A4B38: "RasterState",
+    0x616A903F: "ReflectResource",
+    0xD53B5BAC: "ReflectionGroup",
+    0x1418DD74: "Rig",
+    0x036C2E8E: "RigInfoResource",
+    0x5C66C6BD: "RigInstance",
+    0x94132761: "RoadNetwork",
+    0xE7F23AEE: "SceneLayer",
+    0x7480E00B: "SceneryGroup",
+    0x657192D6: "ScreenParticleEmitterSettings",
+    0x89A7BDF7: "SectionEffects",
+    0x3E50F7D5: "SectionLayout",
+    0x985BE50C: "ShaderBinary",
+    0x0C46AEEF: "ShaderTemplate",
+    0x2C81C14B: "Sidewalk",
+    0xAF015A94: "StateBlock",
+    0xE4868DBE: "SymbolTableResource",
+    0xC462DD28: "TerrainData",
+    0xCDBFA090: "Texture",
+    0x501B8E62: "TextureD3DResource",
+    0x86DE69F6: "TrackStripSettings",
+    0x90EEF023: "TrueCrowdDataBase",
+    0x32890C01: "UELFragmentTable",
+    0x90CE6B7A: "UILocalization",
+    0x9F34FF46: "UIMinimapTile",
+    0x442A39D9: "UIScreen",
+    0x2C40FA26: "UniqueUIDTableResource",
+    0xF7FC6B2D: "VertexDecl",
+    0xA8EB0D0C: "VolumetricEffectSettings",
+    0x1146D4C8: "WeightSetGroupResource",
+    0x24D0C3A0: "XMLFile",
+    0x43FF83A9: "ZoneLayout",
+}
+
+TEXTURE = 0xCDBFA090
+
+# candidates are pre-filtered on the low 16 bits of each 4-byte window, the
+# scan runs over blocks of this many bytes to keep the temporaries small
+SCAN_BLOCK_SIZE = 1 << 24
+
+
+TEXTURE_FORMATS = {1: "DXT1", 2: "DXT3", 3: "DXT5"}
+
+TextureHeader = namedtuple('TextureHeader', 'offset name format height width type2 raw_offset raw_size')
+
+
+def parse_texture_header(data, offset):
+    name_end = data.find(b'\x00', offset + 44)
+    try:
+        texture_name = bytes(data[offset + 44:name_end]).decode('utf-8')
+    except UnicodeDecodeError:
+        log.warning("Skipping texture at offset %d due to Unicode decoding error.", offset)
+        return None
+
+    i = name_end + 1
+    while data[i] == 0:
+        i += 1
+
+    texture_type = struct.unpack_from('<I', data, i)[0]
+    height, width = struct.unpack_from('<HH', data, i + 8)
+    texturetype2 = struct.unpack_from('<I', data, i + 12)[0]
+    # 28 unknown bytes between TextureType2 and the raw data location
+    rawdataoffset, rawdatasize = struct.unpack_from('<II', data, i + 44)
+
+    return TextureHeader(offset, texture_name, texture_type, height, width, texturetype2, rawdataoffset, rawdatasize)
+
+
+def texture_detail(header):
+    texture_type_str = TEXTURE_FORMATS.get(header.format, "Unknown")
+    return (f"Name: {header.name}, Type: {texture_type_str}, Height: {header.height}, Width: {header.width}, "
+            f"TextureType2: {header.type2}, RawDataOffset: {header.raw_offset}, RawDataSize: {header.raw_size}")
+
+
+def _iter_find(data, type_ids):
+    # one data.find sweep per id, only used when numpy is not available
+    found = []
+    for res_type in type_ids:
+        pattern = struct.pack('<I', res_type)
+        offset = data.find(pattern)
+        while offset != -1:
+            found.append((offset, res_type))
+            offset = data.find(pattern, offset + 1)
+    found.sort()
+    yield len(data), [offset for offset, _ in found], [res_type for _, res_type in found]
+
+
+def _iter_numpy(data, type_ids, np):
+    ids = np.array(sorted(type_ids), dtype=np.uint32)
+    low = np.zeros(1 << 16, dtype=bool)
+    low[ids & 0xFFFF] = True
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+    last = len(buf) - 3  # one past the last offset a full id can start at
+    for start in range(0, max(last, 0), SCAN_BLOCK_SIZE):
+        stop = min(start + SCAN_BLOCK_SIZE, last)
+        candidates = []
+        # the two uint16 views together cover a 2-byte window at every offset
+        for align in (0, 1):
+            count = (stop - start - align + 1) // 2
+            if count <= 0:
+                continue
+            words = np.frombuffer(data, dtype='<u2', count=count, offset=start + align)
+            candidates.append(np.flatnonzero(low[words]) * 2 + (start + align))
+        candidates = np.sort(np.concatenate(candidates))
+        candidates = candidates[candidates < stop]
+        values = (buf[candidates].astype(np.uint32)
+                  | buf[candidates + 1].astype(np.uint32) << 8
+                  | buf[candidates + 2].astype(np.uint32) << 16
+                  | buf[candidates + 3].astype(np.uint32) << 24)
+        match = np.isin(values, ids)
+        yield stop, candidates[match].tolist(), values[match].tolist()
+        release(data, start, stop - start)
+
+
+def iter_type_ids(data, type_ids=resource_types):
+    """Find every byte offset of each 4-byte little-endian id in one pass.
+
+    Yields (scanned, offsets, type_ids) in file order, one scan block at a
+    time, scanned being how far into data the scan has got. The block is
+    still mapped in while the caller handles it, so look at the bytes around
+    a hit before asking for the next block.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return _iter_find(data, type_ids)
+    return _iter_numpy(data, type_ids, numpy)
+
+
+def scan_type_ids(data, type_ids=resource_types):
+    """Returns {type_id: [offset, ...]} with offsets ascending, the same offsets
+    a repeated data.find(struct.pack('<I', type_id)) sweep would visit.
+    """
+    hits = {}
+    for _, offsets, res_types in iter_type_ids(data, type_ids):
+        for offset, res_type in zip(offsets, res_types):
+            hits.setdefault(res_type, []).append(offset)
+    return hits
@@ -0,0 +1,246 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import namedtuple
+from types import SimpleNamespace
+
+from .batch import discover
+from .binreader import mapped
+from .chunks import ChainError, iter_chunks
+from .exporters import GltfBuffer
+from .instrument import add_arguments, count, from_args, timer
+from .model import Tables
+from .registry import Dispatcher
+from .resources import TEXTURE, parse_texture_header
+from .streams import POSITION_FORMATS, decode_indices, decode_positions, decode_uvs
+from .vehicle_map import submesh_jobs
+
+log = logging.getLogger(__name__)
+
+# One glTF scene for a whole zone directory. Every vertex, UV and index range
+# is written to the shared .bin once: within a file streams are known by
+# resource id, across files by a hash of their raw bytes, so a buffer
+# referenced from many meshes or files becomes a single accessor. Meshes with
+# the same accessors and material become one glTF mesh, and every submesh
+# the vehicle parser would export becomes a node instancing it, grouped under
+# one node per perm.bin. Materials carry the diffuse and specular texture of
+# the Material chunk, by name when the texture header is in the same file.
+
+SceneStats = namedtuple('SceneStats', 'files instances meshes accessors materials raw_bytes written_bytes')
+
+
+def _digest(data, start, size):
+    return hashlib.blake2b(data[start:start + size], digest_size=16).digest()
+
+
+# called as handler(chunk, data, scene, state) while add_file walks a file,
+# state holds that file's tables, texture names and ModelData chunks
+handlers = Dispatcher()
+
+
+@handlers.register('Buffer')
+def buffer(chunk, data, scene, state):
+    stream = state.tables.add_stream(data, chunk)
+    scene.raw_bytes += stream.stride * stream.count
+
+
+@handlers.register('Material')
+def material(chunk, data, scene, state):
+    state.tables.add_material(data, chunk)
+
+
+@handlers.register(TEXTURE)
+def texture(chunk, data, scene, state):
+    header = parse_texture_header(data, chunk.offset)
+    if header is not None:
+        state.textures[chunk.resource_id] = header.name
+
+
+@handlers.register('ModelData')
+def model_data(chunk, data, scene, state):
+    state.models.append(chunk)
+
+
+class Scene:
+    """Collects the geometry of perm.bin files into one glTF document whose
+    arrays are appended to bin_file as they are first seen."""
+
+    def __init__(self, bin_file, bin_uri):
+        self.buffer = GltfBuffer(bin_file)
+        self.bin_uri = bin_uri
+        self.raw_bytes = 0
+        self.meshes = []
+        self.materials = []
+        self.nodes = []
+        self.roots = []
+        # content key -> accessor, (accessors, material) -> mesh, textures -> material
+        self.by_content = {}
+        self.by_mesh = {}
+        self.by_material = {}
+
+    def _stream(self, data, stream, local, kind):
+        # a resource id seen before in this file skips the hash, one seen in
+        # another file or under another id is found by its bytes
+        accessor = local.get((kind, stream.resource_id))
+        if accessor is not None:
+            count('scene.shared_accessors')
+            return accessor
+        key = (kind, stream.stride, _digest(data, stream.offset, stream.stride * stream.count))
+        accessor = self.by_content.get(key)
+        if accessor is None:
+            with timer('scene.decode'):
+                if kind == 'positions':
+                    accessor = self.buffer.add_positions(
+                        decode_positions(data, stream.offset, stream.stride, stream.count))
+                else:
+                    accessor = self.buffer.add_uvs(decode_uvs(data, stream.offset, stream.stride, stream.count))
+            self.by_content[key] = accessor
+        else:
+            count('scene.shared_accessors')
+        local[kind, stream.resource_id] = accessor
+        return accessor
+
+    def _indices(self, data, stream, start, stop):
+        # full triangles only, keyed by the bytes of just that range. None
+        # for an empty range, the primitive then draws without indices
+        start, stop, _ = slice(start, stop).indices(stream.count)
+        stop = start + max(0, stop - start) // 3 * 3
+        if stop == start:
+            return None
+        key = ('indices', _digest(data, stream.offset + start * 2, (stop - start) * 2))
+        accessor = self.by_content.get(key)
+        if accessor is None:
+            with timer('scene.decode'):
+                accessor = self.buffer.add_indices(decode_indices(data, stream.offset, stream.count, start, stop))
+            self.by_content[key] = accessor
+        else:
+            count('scene.shared_accessors')
+        return accessor
+
+    def _material(self, material, textures):
+        def name(texture_id):
+            if texture_id is None:
+                return None
+            return textures.get(texture_id, f"{texture_id:#010x}")
+
+        key = (name(material.diffuse), name(material.specular))
+        index = self.by_material.get(key)
+        if index is None:
+            extras = {}
+            if material.diffuse is not None:
+                extras['diffID'] = material.diffuse
+                extras['diffuse'] = key[0]
+            if material.specular is not None:
+                extras['specID'] = material.specular
+                extras['specular'] = key[1]
+            self.materials.append({'name': key[0] or f"material_{len(self.materials)}", 'extras': extras})
+            index = self.by_material[key] = len(self.materials) - 1
+        return index
+
+    def add_file(self, perm_path, name=None):
+        """Add every submesh of perm_path as an instance under a node called
+        name, by default the path. Returns the number of instances added."""
+        name = name or perm_path
+        children = []
+        state = SimpleNamespace(tables=Tables(), textures={}, models=[])
+        with mapped(perm_path) as data:
+            # models are resolved after the walk, once every stream, material
+            # and texture name in the file is known
+            try:
+                for chunk in iter_chunks(data):
+                    handlers.dispatch(chunk, data, self, state)
+            except ChainError as e:
+                log.warning("%s: %s, stopping there", perm_path, e)
+            local = {}
+            for chunk in state.models:
+                children.extend(self._model(data, chunk, state.tables, state.textures, local, name))
+        if children:
+            self.nodes.append({'name': name, 'children': children})
+            self.roots.append(len(self.nodes) - 1)
+        count('scene.files')
+        count('scene.instances', len(children))
+        return len(children)
+
+    def _model(self, data, chunk, tables, textures, local, name):
+        # the same submeshes the vehicle parser exports, under the same names
+        nodes = []
+        for job in submesh_jobs(data, chunk, tables, name):
+            if job.positions.stride not in POSITION_FORMATS or not job.positions.count:
+                log.warning("Mesh %s of %s has no vertices in a supported format (stride %d), skipping it",
+                            job.name, name, job.positions.stride)
+                continue
+            attributes = {'POSITION': self._stream(data, job.positions, local, 'positions')}
+            if job.uvs is not None:
+                attributes['TEXCOORD_0'] = self._stream(data, job.uvs, local, 'uvs')
+            primitive = {'attributes': attributes, 'mode': 4}
+            indices = self._indices(data, job.indices, job.start, job.stop)
+            if indices is not None:
+                primitive['indices'] = indices
+            material = tables.materials.get(job.material)
+            if material is not None:
+                primitive['material'] = self._material(material, textures)
+            key = json.dumps(primitive, sort_keys=True)
+            mesh = self.by_mesh.get(key)
+            if mesh is None:
+                self.meshes.append({'primitives': [primitive]})
+                mesh = self.by_mesh[key] = len(self.meshes) - 1
+            self.nodes.append({'name': job.name, 'mesh': mesh})
+            nodes.append(len(self.nodes) - 1)
+        return nodes
+
+    def document(self):
+        doc = {'asset': {'version': '2.0', 'generator': 'Xiasi'}, 'scene': 0,
+               'scenes': [{'nodes': self.roots}]}
+        if self.nodes:
+            doc['nodes'] = self.nodes
+        if self.meshes:
+            doc['meshes'] = self.meshes
+        if self.materials:
+            doc['materials'] = self.materials
+        if self.buffer.accessors:
+            self.buffer.document(doc, self.bin_uri)
+        return doc
+
+
+def assemble(root, out_path):
+    """Write every perm.bin under root into one glTF scene at out_path, with
+    its arrays in a .bin next to it. Returns SceneStats."""
+    bin_path = os.path.splitext(out_path)[0] + '.bin'
+    with open(bin_path, 'wb') as bin_file:
+        scene = Scene(bin_file, os.path.basename(bin_path))
+        pairs = discover(root)
+        for perm, _ in pairs:
+            name = os.path.relpath(perm, root)
+            log.info("Adding %s", name)
+            with timer('scene.file'):
+                scene.add_file(perm, name)
+    count('scene.bytes', scene.buffer.size)
+    with open(out_path, 'w') as output_file:
+        json.dump(scene.document(), output_file, sort_keys=True, separators=(',', ':'))
+    return SceneStats(len(pairs), sum(len(scene.nodes[node]['children']) for node in scene.roots),
+                      len(scene.meshes), len(scene.buffer.accessors), len(scene.materials),
+                      scene.raw_bytes, scene.buffer.size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Assemble every perm.bin under a zone directory into one glTF scene")
+    parser.add_argument('root', help="zone directory")
+    parser.add_argument('--out', default=None, help="scene to write (default: <root>/scene.gltf)")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    out = args.out or os.path.join(args.root, 'scene.gltf')
+    start = time.perf_counter()
+    with from_args(args):
+        stats = assemble(args.root, out)
+    print(f"{stats.files} files, {stats.instances} instances of {stats.meshes} meshes, "
+          f"{stats.accessors} accessors, {stats.materials} materials, "
+          f"{stats.written_bytes / 2**20:.1f} MB written from {stats.raw_bytes / 2**20:.1f} MB of streams "
+          f"in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Streams are decoded whole. A stream record (v[3] stride, v[4] count) and the
+# offset its data starts at become one strided numpy view over the mapped
+# file, converted in a single call. Results are copies so the mapping can be
+# closed while they are still in use. read.bytes counts the stream bytes
+# each decode covers.
+
+from . import instrument
+
+# vertex stride -> (component dtype, scale)
+POSITION_FORMATS = {
+    16: ('<i2', 2**-14),
+    12: ('<f4', None),
+}
+
+
+def _view(data, offset, stride, count, dtype, components):
+    import numpy as np
+
+    dtype = np.dtype(dtype)
+    if count == 0:
+        return np.empty((0, components), dtype=dtype)
+    return np.ndarray((count, components), dtype=dtype, buffer=data, offset=offset,
+                      strides=(stride, dtype.itemsize))
+
+
+def decode_positions(data, offset, stride, count):
+    """(count, 3) float32 positions, int16 * 2^-14 for stride 16 and
+    float32 for stride 12. Unknown strides decode to no vertices."""
+    import numpy as np
+
+    if stride not in POSITION_FORMATS:
+        return np.empty((0, 3), dtype=np.float32)
+    dtype, scale = POSITION_FORMATS[stride]
+    instrument.count('decode.vertices', count)
+    instrument.count('read.bytes', stride * count)
+    positions = _view(data, offset, stride, count, dtype, 3).astype(np.float32)
+    if scale is not None:
+        positions *= scale
+    return positions
+
+
+def decode_uvs(data, offset, stride, count):
+    """(count, 2) float32 UVs from the leading float16 pair of each record."""
+    import numpy as np
+
+    instrument.count('decode.uvs', count)
+    instrument.count('read.bytes', stride * count)
+    return _view(data, offset, stride, count, '<f2', 2).astype(np.float32)
+
+
+def decode_indices(data, offset, count, start=0, stop=None):
+    """uint16 indices [start:stop] of an index stream holding count of them,
+    clamped like a slice of the whole stream would be."""
+    import numpy as np
+
+    start, stop, _ = slice(start, stop).indices(count)
+    stop = max(start, stop)
+    instrument.count('decode.indices', stop - start)
+    instrument.count('read.bytes', (stop - start) * 2)
+    return np.frombuffer(data, dtype='<u2', count=stop - start, offset=offset + start * 2).copy()
+
+
+def empty(components):
+    """A zero-length decoded stream, for meshes that have none."""
+    import numpy as np
+
+    return np.empty((0, components), dtype=np.float32)
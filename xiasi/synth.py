@@ -0,0 +1,181 @@
+import argparse
+import random
+import struct
+from collections import namedtuple
+
+from .chunks import CHUNK_HEADER, CHUNK_INFO, CHUNK_PADDING
+from .model import DIFFUSE_MAP, SPECULAR_MAP
+from .registry import type_id
+from .resources import TEXTURE, resource_types
+
+# Synthetic zone files for benchmarks and for checking the parsers without
+# game data. The layout follows what the parsers read: a vm header, vm[3]
+# skipped bytes, the vc block and padding before the data; Buffer chunks
+# start with a 32-uint stream record, ModelData with 32 uints and a list of
+# self-relative offsets to 36-uint mesh records.
+
+BUFFER = type_id('Buffer')
+MODEL_DATA = type_id('ModelData')
+MATERIAL = type_id('Material')
+BONE_PALETTE = type_id('BonePalette')
+
+# chunk types that only ever show up as filler
+FILLER_TYPES = [res_type for res_type in resource_types
+                if res_type not in (TEXTURE, BUFFER, MODEL_DATA, MATERIAL, BONE_PALETTE)]
+
+ZoneStats = namedtuple('ZoneStats', 'perm_size temp_size models vertices triangles textures')
+
+
+def chunk(type_id, payload, resource_id, skip=8):
+    size = skip + CHUNK_INFO.size + CHUNK_PADDING + len(payload)
+    size += -size % 16
+    info = CHUNK_INFO.pack(0, 0, 0, resource_id, 0, 0, 0)
+    data = CHUNK_HEADER.pack(type_id, size, 0, skip) + bytes(skip) + info + bytes(CHUNK_PADDING) + payload
+    return data + bytes(CHUNK_HEADER.size + size - len(data))
+
+
+def stream(stride, count, body):
+    v = [0] * 32
+    v[3] = stride
+    v[4] = count
+    return struct.pack('<32I', *v) + body
+
+
+def mesh_info(num_submeshes, index_id, vertex_id, uv_id, per_mesh, material_id=0):
+    info = [0] * 32
+    info[16] = num_submeshes
+    offsets = []
+    meshes = []
+    for m in range(num_submeshes):
+        va = [0] * 36
+        va[3] = material_id
+        va[11], va[15], va[23] = index_id, vertex_id, uv_id
+        va[29] = m * per_mesh * 3
+        va[30] = per_mesh
+        meshes.append(struct.pack('<36I', *va))
+        # each offset is relative to its own slot in the offset list
+        offsets.append((num_submeshes - m) * 4 + m * 144)
+    return struct.pack('<32I', *info) + struct.pack(f'<{num_submeshes}I', *offsets) + b''.join(meshes)
+
+
+def model_data(num_vertices, num_submeshes=4, stride=16, seed=0, first_id=100):
+    """A chunk chain with one vertex, UV and index stream, a material and a
+    mesh info section splitting the indices into num_submeshes, as the bin
+    parsers expect. Returns the bytes and the number of triangles."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    if stride == 16:
+        vertices = np.zeros((num_vertices, 8), dtype='<i2')
+        vertices[:, :3] = rng.integers(-30000, 30000, (num_vertices, 3))
+    else:
+        vertices = rng.uniform(-5, 5, (num_vertices, 3)).astype('<f4')
+    uvs = np.zeros((num_vertices, 4), dtype='<f2')
+    uvs[:, :2] = rng.random((num_vertices, 2))
+    per_mesh = num_vertices // num_submeshes
+    triangles = per_mesh * num_submeshes
+    indices = rng.integers(0, num_vertices, triangles * 3).astype('<u2')
+
+    vertex_id, uv_id, index_id, material_id, model_id = range(first_id, first_id + 5)
+    material = struct.pack('<8I', 0, 0, 0, 0, 2, 0, 0, 0)
+    material += struct.pack('<8I', DIFFUSE_MAP, 0, 0, 0, 0, 0, first_id, 0)
+    material += struct.pack('<8I', SPECULAR_MAP, 0, 0, 0, 0, 0, first_id + 1, 0)
+    return b''.join([
+        chunk(BUFFER, stream(stride, num_vertices, vertices.tobytes()), vertex_id),
+        chunk(BUFFER, stream(8, num_vertices, uvs.tobytes()), uv_id),
+        chunk(BUFFER, stream(2, triangles * 3, indices.tobytes()), index_id),
+        chunk(MATERIAL, material, material_id),
+        chunk(MODEL_DATA, mesh_info(num_submeshes, index_id, vertex_id, uv_id, per_mesh, material_id), model_id),
+    ]), triangles
+
+
+def texture_chunk(name, fmt, width, height, raw_offset, raw_size, resource_id):
+    # no skipped bytes, so the name lands in the padding 44 bytes after the
+    # type id and the header fields start the chunk data
+    if len(name) >= CHUNK_PADDING:
+        raise ValueError(f"Texture name {name!r} is too long")
+    padding = name.encode() + bytes(CHUNK_PADDING - len(name))
+    header = struct.pack('<IIHHI', fmt, 0, height, width, 0) + bytes(28) + struct.pack('<II', raw_offset, raw_size)
+    info = CHUNK_INFO.pack(0, 0, 0, resource_id, 0, 0, 0)
+    size = CHUNK_INFO.size + CHUNK_PADDING + len(header)
+    size += -size % 16
+    data = CHUNK_HEADER.pack(TEXTURE, size, 0, 0) + info + padding + header
+    return data + bytes(CHUNK_HEADER.size + size - len(data))
+
+
+def bone_chunk(names, resource_id):
+    payload = struct.pack('<8I', 0, len(names), 0, 0, 0, 0, 0, 0) + bytes(160)
+    payload += b''.join(name.encode().ljust(64, b'\0') for name in names)
+    payload += bytes(8 * len(names))
+    return chunk(BONE_PALETTE, payload, resource_id)
+
+
+def write_zone(perm_path, size, temp_path=None, vertices=2000, submeshes=4, texture_size=128,
+               textures_per_model=2, filler=0.5, seed=0):
+    """Write a synthetic perm.bin of about size bytes, and its temp.bin.
+
+    The perm.bin is models (alternating stride 16 and 12 vertex streams, UVs,
+    indices, a material and a mesh info section), texture headers and filler
+    chunks of random bytes, with filler the fraction of the file that is
+    filler. Texture pixel data goes to temp_path, next to the perm.bin by
+    default. Chunks are written as they are generated, so size can be larger
+    than memory.
+    """
+    import numpy as np
+
+    if temp_path is None:
+        temp_path = perm_path[:-len('perm.bin')] + 'temp.bin' if perm_path.endswith('perm.bin') else perm_path + '.temp'
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    raw_size = max(1, texture_size // 4) ** 2 * 16
+    resource_id = 1
+    models = total_vertices = total_triangles = textures = 0
+    with open(perm_path, 'wb') as perm, open(temp_path, 'wb') as temp:
+        perm.write(bone_chunk([f"bone_{i}" for i in range(8)], resource_id))
+        resource_id += 1
+        while perm.tell() < size:
+            data, triangles = model_data(vertices, submeshes, 16 if models % 2 == 0 else 12,
+                                         seed + models, resource_id)
+            perm.write(data)
+            resource_id += 5
+            models += 1
+            total_vertices += vertices
+            total_triangles += triangles
+            for _ in range(textures_per_model):
+                fmt = rng.randrange(1, 4)
+                perm.write(texture_chunk(f"tex_{textures:08d}", fmt, texture_size, texture_size,
+                                         temp.tell(), raw_size, resource_id))
+                temp.write(np_rng.integers(0, 256, raw_size, dtype=np.uint8).tobytes())
+                resource_id += 1
+                textures += 1
+            if filler:
+                filler_size = int(len(data) * filler / (1 - filler))
+                perm.write(chunk(rng.choice(FILLER_TYPES), np_rng.bytes(filler_size), resource_id))
+                resource_id += 1
+        perm_size = perm.tell()
+        temp_size = temp.tell()
+    return ZoneStats(perm_size, temp_size, models, total_vertices, total_triangles, textures)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic perm.bin/temp.bin pair")
+    parser.add_argument('perm', help="perm.bin to write, the temp.bin goes next to it")
+    parser.add_argument('--size', type=float, default=64, help="perm.bin size in MB")
+    parser.add_argument('--vertices', type=int, default=2000, help="vertices per model")
+    parser.add_argument('--submeshes', type=int, default=4, help="submeshes per model")
+    parser.add_argument('--texture-size', type=int, default=128, help="texture width and height")
+    parser.add_argument('--textures', type=int, default=2, help="textures per model")
+    parser.add_argument('--filler', type=float, default=0.5, help="fraction of the file that is filler chunks")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    if not 0 <= args.filler < 1:
+        parser.error("--filler must be in [0, 1)")
+
+    stats = write_zone(args.perm, int(args.size * 2**20), None, args.vertices, args.submeshes,
+                       args.texture_size, args.textures, args.filler, args.seed)
+    print(f"{stats.perm_size / 2**20:.1f} MB perm.bin, {stats.temp_size / 2**20:.1f} MB temp.bin, "
+          f"{stats.models} models, {stats.vertices} vertices, {stats.triangles} triangles, {stats.textures} textures")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+import argparse
+import logging
+import os
+import re
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from .binreader import mapped
+from .index import file_index
+from .instrument import add_arguments, count, from_args, timer
+from .resources import TEXTURE_FORMATS
+
+log = logging.getLogger(__name__)
+
+# bytes per 4x4 block
+BLOCK_SIZES = {"DXT1": 8, "DXT3": 16, "DXT5": 16}
+
+# textures handed to a worker at a time when decoding to png
+DECODE_BATCH = 32
+
+_DDS_FLAGS = 0x1 | 0x2 | 0x4 | 0x1000 | 0x80000  # caps, height, width, pixelformat, linearsize
+_DDS_MIPMAPCOUNT = 0x20000
+_DDPF_FOURCC = 0x4
+_DDSCAPS_TEXTURE = 0x1000
+_DDSCAPS_MIPMAP = 0x8 | 0x400000  # complex, mipmap
+
+
+def texture_format(header):
+    return TEXTURE_FORMATS.get(header.format)
+
+
+def level_size(fmt, width, height):
+    return max(1, (width + 3) // 4) * max(1, (height + 3) // 4) * BLOCK_SIZES[fmt]
+
+
+def mip_count(fmt, width, height, raw_size):
+    """Number of mip levels that exactly fill raw_size, 1 if they don't."""
+    total = 0
+    levels = 0
+    while True:
+        total += level_size(fmt, width, height)
+        levels += 1
+        if total == raw_size:
+            return levels
+        if total > raw_size or (width == 1 and height == 1):
+            return 1
+        width = max(1, width // 2)
+        height = max(1, height // 2)
+
+
+def level_offset(fmt, width, height, level):
+    """Byte offset of mip level `level` and its width and height."""
+    offset = 0
+    for _ in range(level):
+        offset += level_size(fmt, width, height)
+        width = max(1, width // 2)
+        height = max(1, height // 2)
+    return offset, width, height
+
+
+def dds_header(header):
+    fmt = texture_format(header)
+    mips = mip_count(fmt, header.width, header.height, header.raw_size)
+    flags = _DDS_FLAGS | (_DDS_MIPMAPCOUNT if mips > 1 else 0)
+    caps = _DDSCAPS_TEXTURE | (_DDSCAPS_MIPMAP if mips > 1 else 0)
+    return (b'DDS ' +
+            struct.pack('<7I', 124, flags, header.height, header.width,
+                        level_size(fmt, header.width, header.height), 0, mips) +
+            bytes(44) +
+            struct.pack('<2I4s5I', 32, _DDPF_FOURCC, fmt.encode('ascii'), 0, 0, 0, 0, 0) +
+            struct.pack('<5I', caps, 0, 0, 0, 0))
+
+
+def raw_data(data, header):
+    """The texture's blocks as a memoryview into temp.bin, None if out of range."""
+    end = header.raw_offset + header.raw_size
+    if end > len(data):
+        return None
+    return memoryview(data)[header.raw_offset:end]
+
+
+def write_dds(path, data, header):
+    with open(path, 'wb') as file:
+        file.write(dds_header(header))
+        file.write(raw_data(data, header))
+
+
+def _unpack_565(colors, np):
+    r = (colors >> 11) & 31
+    g = (colors >> 5) & 63
+    b = colors & 31
+    return np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)], axis=-1)
+
+
+def _color_blocks(blocks, np, punch_through):
+    # blocks: (n, 8) uint8 BC1 color part -> (n, 16, 4) rgba
+    n = len(blocks)
+    c0 = blocks[:, 0:2].copy().view('<u2')[:, 0].astype(np.int32)
+    c1 = blocks[:, 2:4].copy().view('<u2')[:, 0].astype(np.int32)
+    p0 = _unpack_565(c0, np)
+    p1 = _unpack_565(c1, np)
+    palette = np.empty((n, 4, 4), dtype=np.int32)
+    palette[:, :, 3] = 255
+    palette[:, 0, :3] = p0
+    palette[:, 1, :3] = p1
+    four = ~punch_through | (c0 > c1)
+    palette[:, 2, :3] = np.where(four[:, None], (2 * p0 + p1) // 3, (p0 + p1) // 2)
+    palette[:, 3, :3] = np.where(four[:, None], (p0 + 2 * p1) // 3, 0)
+    palette[:, 3, 3] = np.where(four, 255, 0)
+
+    bits = blocks[:, 4:8].copy().view('<u4')[:, 0]
+    selectors = (bits[:, None] >> (2 * np.arange(16, dtype=np.uint32))) & 3
+    return palette[np.arange(n)[:, None], selectors]
+
+
+def _bc2_alpha(blocks, np):
+    bits = blocks[:, 0:8].copy().view('<u8')[:, 0]
+    return ((bits[:, None] >> (4 * np.arange(16, dtype=np.uint64))) & 15).astype(np.int32) * 17
+
+
+def _bc3_alpha(blocks, np):
+    n = len(blocks)
+    a0 = blocks[:, 0].astype(np.int32)
+    a1 = blocks[:, 1].astype(np.int32)
+    palette = np.empty((n, 8), dtype=np.int32)
+    palette[:, 0] = a0
+    palette[:, 1] = a1
+    eight = a0 > a1
+    for i in range(1, 7):
+        palette[:, i + 1] = ((7 - i) * a0 + i * a1) // 7
+    for i in range(1, 5):
+        palette[:, i + 1] = np.where(eight, palette[:, i + 1], ((5 - i) * a0 + i * a1) // 5)
+    palette[:, 6] = np.where(eight, palette[:, 6], 0)
+    palette[:, 7] = np.where(eight, palette[:, 7], 255)
+
+    raw = np.zeros((n, 8), dtype=np.uint8)
+    raw[:, :6] = blocks[:, 2:8]
+    bits = raw.view('<u8')[:, 0]
+    selectors = ((bits[:, None] >> (3 * np.arange(16, dtype=np.uint64))) & 7).astype(np.intp)
+    return palette[np.arange(n)[:, None], selectors]
+
+
+def decode_blocks(raw, fmt, width, height):
+    """Top mip level of a DXT1/3/5 texture as an (height, width, 4) uint8 array.
+
+    Every block is decoded at once with numpy, there is no per-pixel loop.
+    """
+    import numpy as np
+
+    bw = max(1, (width + 3) // 4)
+    bh = max(1, (height + 3) // 4)
+    size = BLOCK_SIZES[fmt]
+    blocks = np.frombuffer(raw, dtype=np.uint8, count=bw * bh * size).reshape(-1, size)
+    if fmt == "DXT1":
+        pixels = _color_blocks(blocks, np, np.ones(len(blocks), dtype=bool))
+    else:
+        pixels = _color_blocks(blocks[:, 8:], np, np.zeros(len(blocks), dtype=bool))
+        pixels[:, :, 3] = _bc2_alpha(blocks, np) if fmt == "DXT3" else _bc3_alpha(blocks, np)
+    image = pixels.astype(np.uint8).reshape(bh, bw, 4, 4, 4).transpose(0, 2, 1, 3, 4)
+    return image.reshape(bh * 4, bw * 4, 4)[:height, :width]
+
+
+def _png_chunk(kind, payload):
+    return struct.pack('>I', len(payload)) + kind + payload + struct.pack('>I', zlib.crc32(kind + payload))
+
+
+def png_bytes(rgba, level=6):
+    import numpy as np
+
+    height, width = rgba.shape[:2]
+    rows = np.zeros((height, width * 4 + 1), dtype=np.uint8)  # filter byte 0 per row
+    rows[:, 1:] = rgba.reshape(height, width * 4)
+    return (b'\x89PNG\r\n\x1a\n' +
+            _png_chunk(b'IHDR', struct.pack('>2I5B', width, height, 8, 6, 0, 0, 0)) +
+            _png_chunk(b'IDAT', zlib.compress(rows.tobytes(), level)) +
+            _png_chunk(b'IEND', b''))
+
+
+def write_png(path, rgba, level=6):
+    with open(path, 'wb') as file:
+        file.write(png_bytes(rgba, level))
+
+
+def thumbnail(data, header, size):
+    """The texture at most size pixels on a side, as an rgba array.
+
+    Decodes the largest mip level that fits when the texture has mips, then
+    drops rows and columns if it still doesn't. None if the texture can't
+    be read.
+    """
+    fmt = texture_format(header)
+    raw = raw_data(data, header)
+    if fmt is None or raw is None or header.raw_size < level_size(fmt, header.width, header.height):
+        return None
+    level = 0
+    mips = mip_count(fmt, header.width, header.height, header.raw_size)
+    while level + 1 < mips and max(level_offset(fmt, header.width, header.height, level)[1:]) > size:
+        level += 1
+    offset, width, height = level_offset(fmt, header.width, header.height, level)
+    rgba = decode_blocks(raw[offset:], fmt, width, height)
+    step = -(-max(width, height) // size)
+    return rgba[::step, ::step]
+
+
+def temp_path_for(perm_path):
+    """The temp.bin next to a perm.bin, None if there isn't one."""
+    if not perm_path.endswith('perm.bin'):
+        return None
+    temp_path = perm_path[:-len('perm.bin')] + 'temp.bin'
+    return temp_path if os.path.exists(temp_path) else None
+
+
+def _decode_batch(temp_path, jobs):
+    # runs in a worker: map temp.bin once and decode a batch of textures
+    written = []
+    with mapped(temp_path) as data:
+        for header, path in jobs:
+            rgba = decode_blocks(raw_data(data, header), texture_format(header), header.width, header.height)
+            write_png(path, rgba)
+            written.append(path)
+    return written
+
+
+def output_names(headers):
+    """File name stem per header, made safe for the filesystem; a name used
+    more than once gets the header's offset appended."""
+    names = [re.sub(r'[^\w.-]', '_', header.name) or "texture" for header in headers]
+    counts = {}
+    for name in names:
+        counts[name] = counts.get(name, 0) + 1
+    return [name if counts[name] == 1 else f"{name}_{header.offset}" for name, header in zip(names, headers)]
+
+
+def extract_textures(perm_path, temp_path, out_dir, fmt='dds', workers=None):
+    """Write every texture listed in perm_path out of temp_path as .dds or
+    .png files in out_dir. Returns the list of files written."""
+    textures = file_index(perm_path).textures
+    os.makedirs(out_dir, exist_ok=True)
+    outputs = []
+    jobs = []
+    with mapped(temp_path) as data:
+        for header, name in zip(textures, output_names(textures)):
+            if texture_format(header) is None:
+                log.warning("Skipping texture %s: unknown format %d", header.name, header.format)
+                continue
+            if raw_data(data, header) is None or header.raw_size < level_size(texture_format(header), header.width, header.height):
+                log.warning("Skipping texture %s: raw data out of range", header.name)
+                continue
+            path = os.path.join(out_dir, f"{name}.{fmt}")
+            if fmt == 'dds':
+                with timer('textures.dds'):
+                    write_dds(path, data, header)
+                count('textures.bytes', header.raw_size)
+                outputs.append(path)
+            else:
+                jobs.append((header, path))
+    if jobs:
+        batches = [jobs[i:i + DECODE_BATCH] for i in range(0, len(jobs), DECODE_BATCH)]
+        with timer('textures.png'), ProcessPoolExecutor(max_workers=workers) as pool:
+            for written in pool.map(_decode_batch, [temp_path] * len(batches), batches):
+                outputs.extend(written)
+    return outputs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract the textures of a perm.bin/temp.bin pair")
+    parser.add_argument('perm', help="perm.bin holding the texture headers")
+    parser.add_argument('temp', nargs='?', help="temp.bin holding the pixel data (default: next to perm)")
+    parser.add_argument('--format', choices=('dds', 'png'), default='dds')
+    parser.add_argument('--out', default=None, help="output directory (default: <perm>_textures)")
+    parser.add_argument('--workers', type=int, default=None, help="png decode processes (default: one per CPU)")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    temp = args.temp or temp_path_for(args.perm)
+    if temp is None or not os.path.exists(temp):
+        parser.error(f"no temp.bin for {args.perm}")
+    start = time.perf_counter()
+    with from_args(args):
+        outputs = extract_textures(args.perm, temp, args.out or f"{args.perm}_textures", args.format, args.workers)
+    print(f"{len(outputs)} textures written in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import argparse
+import logging
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+from . import instrument
+from .binreader import BinaryReader, map_file, release
+from .chunks import CHUNK_HEADER, ChainError, iter_chunks
+from .exporters import EXPORTERS, export_mesh, mesh_path
+from .instrument import add_arguments, from_args, timer
+from .model import Tables, read_mesh_records
+from .registry import Dispatcher
+from .streams import decode_indices, decode_positions, decode_uvs
+
+log = logging.getLogger(__name__)
+
+# bump when the output of this parser changes, the batch converter
+# re-exports everything recorded with an older version
+PARSER_VERSION = 1
+
+# submeshes handed to a worker at a time when exporting in parallel
+JOB_BATCH = 16
+
+# one submesh the parser exports: name is offset_<t>_mesh_<m> after the mesh
+# info section, positions, uvs and indices are Streams, uvs None when the mesh
+# has none, and [start:stop] is its range of the index stream
+SubmeshJob = namedtuple('SubmeshJob', 'name positions uvs indices start stop material')
+
+handlers = Dispatcher()
+
+@handlers.register('BonePalette')
+def bone_palette(chunk, g, state):
+    state.tables.add_bones(g.data, chunk)
+    log.debug("Bones: %s", state.tables.bone_names)
+
+def submesh_jobs(data, chunk, tables, filename):
+    """A SubmeshJob for every submesh of a ModelData chunk that has an index
+    stream in tables. UVs are dropped when their count doesn't match the
+    vertex count, submeshes without a vertex stream are skipped."""
+    t = chunk.offset + CHUNK_HEADER.size
+    streams = tables.streams
+    log.debug("Found mesh info section at offset %d", t)
+    for m, va in enumerate(read_mesh_records(data, chunk.data_offset)):
+        log.debug("Mesh %d info: %s", m, va)
+
+        if va[11] in streams:
+            log.debug("Material ID: %d", va[3])
+
+            vertexstream = streams.get(va[15])
+            if vertexstream is None:
+                log.warning("Mesh %d of %s has no vertex stream %d, skipping it", m, filename, va[15])
+                continue
+            log.debug("Seeking to vertex stream at offset %d for mesh %d", vertexstream.offset, m)
+
+            num_vertices = vertexstream.count
+            log.debug("Number of vertices: %d", num_vertices)
+
+            uvstream = streams.get(va[23])
+            if uvstream is not None:
+                num_uvs = uvstream.count
+                log.debug("Number of UV pairs: %d", num_uvs)
+
+                if num_uvs != num_vertices:
+                    log.warning("Number of UV pairs (%d) does not match number of vertices (%d) in mesh %d of %s. Skipping UVs.",
+                                num_uvs, num_vertices, m, filename)
+                    uvstream = None
+
+            indicesstream = streams[va[11]]
+            log.debug("Seeking to indices stream at offset %d for mesh %d", indicesstream.offset, m)
+            # could write to block names for now, just using mesh info offset
+            yield SubmeshJob(f"offset_{t}_mesh_{m}", vertexstream, uvstream, indicesstream,
+                             va[29], va[29] + va[30] * 3, va[3])
+
+@handlers.register('ModelData')
+def mesh_info(chunk, g, state):
+    for job in submesh_jobs(g.data, chunk, state.tables, state.filename):
+        if state.jobs is None:
+            state.outputs.extend(export_submesh(g.data, job, state.filename, state.fmt))
+        else:
+            state.jobs.append(job)
+
+def export_submesh(data, job, filename, fmt):
+    with timer('bin_parser.decode'):
+        positions = decode_positions(data, job.positions.offset, job.positions.stride, job.positions.count)
+        uvs = None
+        if job.uvs is not None:
+            uvs = decode_uvs(data, job.uvs.offset, job.uvs.stride, job.uvs.count)
+        indices = decode_indices(data, job.indices.offset, job.indices.count, job.start, job.stop)
+    with timer('bin_parser.export'):
+        return export_mesh(mesh_path(f"{filename}_{job.name}", fmt), positions, uvs, indices, fmt)
+
+@handlers.register('Material')
+def material(chunk, g, state):
+    log.debug("Found material section: %s", state.tables.add_material(g.data, chunk))
+
+@handlers.register('Buffer')
+def buffer(chunk, g, state):
+    log.debug("Found streams section: %s", state.tables.add_stream(g.data, chunk))
+
+# the file as mapped in a worker process, see export_parallel
+_shared = None
+
+def _map_shared(filename):
+    global _shared
+    with open(filename, 'rb') as f:
+        _shared = map_file(f)
+
+def _export_jobs(jobs, filename, fmt, stats):
+    if stats:
+        instrument.reset()
+        instrument.enable()
+    outputs = []
+    for job in jobs:
+        outputs.extend(export_submesh(_shared, job, filename, fmt))
+    # the pages this batch faulted in stay in the page cache for the others
+    release(_shared, 0, len(_shared))
+    return outputs, instrument.report() if stats else None
+
+def export_parallel(filename, jobs, fmt='txt', workers=None):
+    """Decode and export jobs across worker processes that each map
+    filename read-only, so the file is shared through the page cache rather
+    than copied. Returns the files written, in job order."""
+    batches = [jobs[i:i + JOB_BATCH] for i in range(0, len(jobs), JOB_BATCH)]
+    outputs = []
+    with timer('bin_parser.parallel'), \
+            ProcessPoolExecutor(max_workers=workers, initializer=_map_shared, initargs=(filename,)) as pool:
+        for written, report in pool.map(_export_jobs, batches, [filename] * len(batches), [fmt] * len(batches),
+                                        [instrument.enabled] * len(batches)):
+            outputs.extend(written)
+            if report is not None:
+                instrument.merge(report)
+    return outputs
+
+def bin_parser(filename, fmt='txt', workers=1, strict=False):
+    """Export every submesh of filename. With workers other than 1 the walk
+    only records where each submesh's streams are, then export_parallel
+    decodes and writes them across that many processes, None for one per
+    CPU. A broken chunk chain ends the walk with a warning, or with
+    ChainError when strict is set."""
+    with open(filename, 'rb') as f, BinaryReader(f) as g:
+        state = SimpleNamespace(filename=filename, fmt=fmt, outputs=[], tables=Tables(),
+                                jobs=None if workers == 1 else [])
+
+        # chunks are walked, decoded and exported one at a time, so memory
+        # doesn't grow with the size of the file
+        with timer('bin_parser.walk'):
+            try:
+                for chunk in iter_chunks(g.data):
+                    g.seek(chunk.data_offset)
+                    handlers.dispatch(chunk, g, state)
+            except ChainError as e:
+                if strict:
+                    raise
+                log.warning("%s: %s, stopping there", filename, e)
+
+    if state.jobs:
+        state.outputs.extend(export_parallel(filename, state.jobs, fmt, workers))
+    return state.outputs
+
+def file_format_parser(filename, fmt='txt', workers=1, strict=False):
+    log.info("Parsing file: %s", filename)
+    model_id = os.path.basename(filename).split('.')[0]
+    dirname = os.path.dirname(filename)
+    ext = filename.split('.')[-1].lower()
+
+    if ext == 'bin':
+        return bin_parser(filename, fmt, workers, strict)
+    return []
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--format', choices=EXPORTERS, default='txt', help="mesh output format")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes exporting the submeshes of each file, 0 for one per CPU (default: 1)")
+    parser.add_argument('files', nargs='*', metavar='FILE',
+                        help="perm.bin files to convert (default: every *.perm.bin in the current directory)")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    filenames = args.files or sorted(name for name in os.listdir('.') if name.endswith('.perm.bin'))
+    with from_args(args):
+        for filename in filenames:
+            file_format_parser(filename, args.format, args.workers or None)
+
+
+if __name__ == "__main__":
+    main()